@@ -1,6 +1,39 @@
-import time
+from __future__ import annotations
+import functools
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Literal
+
+# Must be set before torch initializes CUDA: expandable segments avoid the
+# fragmentation-driven cudaMalloc/cudaFree tail during long generations.
+os.environ.setdefault("PYTORCH_CUDA_ALLOC_CONF", "expandable_segments:True,max_split_size_mb:512")
+
 import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer, BitsAndBytesConfig
+from transformers import (
+    AutoConfig,
+    AutoModelForCausalLM,
+    AutoTokenizer,
+    BitsAndBytesConfig,
+    StoppingCriteria,
+    StoppingCriteriaList,
+    TextIteratorStreamer,
+)
+
+__all__ = ["TextGenerator"]
+
+log = logging.getLogger(__name__)
+
+
+class _StopOnEvent(StoppingCriteria):
+    """Ends generate() at the next decode step once *event* is set."""
+
+    def __init__(self, event: threading.Event):
+        self.event = event
+
+    def __call__(self, input_ids, scores, **kwargs) -> torch.Tensor:
+        return torch.full((input_ids.shape[0],), self.event.is_set(), dtype=torch.bool, device=input_ids.device)
 
 
 class TextGenerator:
@@ -9,47 +42,289 @@ class TextGenerator:
         model_path: str = r"C:\Users\nicol\Documents\01_Code\models\dolphin-2.6-mistral-7b",
         temperature: float = 0.8,
         top_p: float = 0.95,
+        top_k: int = 50,
         max_new_tokens: int = 200,
         seed: int = 42,
+        static_cache: bool = True,
+        draft_model_path: str | None = None,
+        time_generation: bool = False,
+        quantization: Literal["auto", "nf4", "fp16", "int8"] = "auto",
+        system_prompt: str | None = None,
     ):
         self.temperature = temperature
         self.top_p = top_p
+        self.top_k = top_k
         self.max_new_tokens = max_new_tokens
         self.seed = seed
+        self.static_cache = static_cache
+        self.time_generation = time_generation
+        self.last_elapsed_ms: float | None = None
+        # Single worker reused by every generate_stream() call
+        self._stream_executor: ThreadPoolExecutor | None = None
 
         # Seed CPU (+ all GPUs if present)
         torch.manual_seed(seed)
         if torch.cuda.is_available():
             torch.cuda.manual_seed_all(seed)
+            torch.cuda.set_per_process_memory_fraction(0.95)
 
-        bnb_cfg = BitsAndBytesConfig(
-            load_in_4bit=True,
-            bnb_4bit_use_double_quant=True,
-            bnb_4bit_quant_type="nf4",
-            bnb_4bit_compute_dtype=torch.float16,
-        )
-        self.model = AutoModelForCausalLM.from_pretrained(
-            model_path,
-            device_map="auto",
-            quantization_config=bnb_cfg,
-            torch_dtype="auto",
-        )
-        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+        # bf16 is the recommended NF4 compute dtype on Ampere+; older GPUs
+        # have no bf16 support and fall back to fp16.
+        if torch.cuda.is_available() and torch.cuda.is_bf16_supported():
+            self.dtype = torch.bfloat16
+        else:
+            self.dtype = torch.float16
+
+        if quantization == "auto":
+            quantization = self._pick_quantization(model_path)
+        log.info("TextGenerator: loading %s weights from %s", quantization, model_path)
+        self.quantization = quantization
+
+        if quantization == "nf4":
+            bnb_cfg = BitsAndBytesConfig(
+                load_in_4bit=True,
+                bnb_4bit_use_double_quant=True,
+                bnb_4bit_quant_type="nf4",
+                bnb_4bit_compute_dtype=self.dtype,
+            )
+        elif quantization == "int8":
+            bnb_cfg = BitsAndBytesConfig(load_in_8bit=True)
+        else:
+            # "fp16": plain half-precision weights in self.dtype
+            bnb_cfg = None
+
+        # FlashAttention-2 (requires flash-attn>=2.5) never materializes the
+        # [B, H, T, T] score matrix; SDPA is the fused fallback when it is missing.
+        try:
+            self.model = AutoModelForCausalLM.from_pretrained(
+                model_path,
+                device_map="auto",
+                quantization_config=bnb_cfg,
+                torch_dtype=self.dtype,
+                attn_implementation="flash_attention_2",
+            )
+        except (ImportError, ValueError):
+            self.model = AutoModelForCausalLM.from_pretrained(
+                model_path,
+                device_map="auto",
+                quantization_config=bnb_cfg,
+                torch_dtype=self.dtype,
+                attn_implementation="sdpa",
+            )
+        self.model.eval()
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path, use_fast=True)
+        if not getattr(self.tokenizer, "is_fast", True):
+            log.warning("TextGenerator: no fast tokenizer for %s; tokenizing in Python", model_path)
+
+        # The system prompt never changes, so render and tokenize it once and
+        # only tokenize the user part of each prompt.
+        self._system_prompt = system_prompt
+        self._system_text: str | None = None  # rendered system turn, if templated
+        self._system_prefix_ids = None
+        if system_prompt:
+            if getattr(self.tokenizer, "chat_template", None):
+                self._system_text = self.tokenizer.apply_chat_template(
+                    [{"role": "system", "content": system_prompt}], tokenize=False
+                )
+                prefix = self.tokenizer(self._system_text, return_tensors="pt", add_special_tokens=False)
+            else:
+                prefix = self.tokenizer(system_prompt, return_tensors="pt")
+            self._system_prefix_ids = prefix["input_ids"].to(self.model.device)
+
+        # Per-instance cache so repeated prompts skip tokenization entirely.
+        self._encode = functools.lru_cache(maxsize=128)(self._encode_prompt)
+
+        # Optional draft model for speculative decoding: the main model verifies
+        # several draft tokens per forward instead of emitting one at a time.
+        # Kept unquantized since it has to be fast rather than small.
+        self.assistant_model = None
+        if draft_model_path:
+            self.assistant_model = AutoModelForCausalLM.from_pretrained(
+                draft_model_path,
+                device_map="auto",
+                torch_dtype=self.dtype,
+            )
+            if self.assistant_model.config.vocab_size != self.model.config.vocab_size:
+                raise ValueError("Draft model must share the main model's vocabulary")
 
-    def generate_text(self, prompt: str) -> str:
-        enc = self.tokenizer(prompt, return_tensors="pt").to(self.model.device)
-        if torch.cuda.is_available():
-            torch.cuda.synchronize()
-        t0 = time.perf_counter()
-        out = self.model.generate(
-            **enc,
-            max_new_tokens=self.max_new_tokens,
-            do_sample=True,
-            temperature=self.temperature,
-            top_p=self.top_p,
-        )
         if torch.cuda.is_available():
-            torch.cuda.synchronize()
-        _elapsed = time.perf_counter() - t0
-        text = self.tokenizer.decode(out[0], skip_special_tokens=True)
+            # One full-length warmup maps the allocator's working set (and pays
+            # generate()'s own decode-step compile, if any) before the first
+            # user call.
+            self.generate_text("Hello")
+
+    @staticmethod
+    def _pick_quantization(model_path: str, context_len: int = 4096) -> str:
+        """NF4 dequantization dominates on small models, so load them unquantized
+        when their half-precision weights plus a *context_len* KV cache fit in
+        80% of free GPU memory."""
+        if not torch.cuda.is_available():
+            return "nf4"
+        try:
+            cfg = AutoConfig.from_pretrained(model_path)
+        except (OSError, ValueError):
+            return "nf4"
+        layers = getattr(cfg, "num_hidden_layers", None)
+        d = getattr(cfg, "hidden_size", None)
+        vocab = getattr(cfg, "vocab_size", None)
+        if not (layers and d and vocab):
+            return "nf4"
+        heads = getattr(cfg, "num_attention_heads", None) or 1
+        head_dim = getattr(cfg, "head_dim", None) or d // heads
+        kv_dim = (getattr(cfg, "num_key_value_heads", None) or heads) * head_dim
+        intermediate = getattr(cfg, "intermediate_size", None) or 4 * d
+        # q/o plus (possibly grouped) k/v projections, and a gated up/gate/down MLP
+        per_layer = 2 * d * d + 2 * d * kv_dim + 3 * d * intermediate
+        # Input embeddings and lm_head are vocab x d each unless tied
+        embed = vocab * d * (1 if getattr(cfg, "tie_word_embeddings", False) else 2)
+        context_len = min(context_len, getattr(cfg, "max_position_embeddings", None) or context_len)
+        # Static cache: keys and values for every layer over the full context
+        kv_cache = 2 * layers * kv_dim * context_len
+        fp16_bytes = 2 * (layers * per_layer + embed + kv_cache)
+        free_bytes, _total = torch.cuda.mem_get_info()
+        return "fp16" if fp16_bytes <= 0.8 * free_bytes else "nf4"
+
+    def _generate(
+        self,
+        enc,
+        streamer: TextIteratorStreamer | None = None,
+        stopping_criteria: StoppingCriteriaList | None = None,
+    ) -> torch.Tensor:
+        if self.temperature <= 0:
+            # Greedy decoding: no softmax/multinomial over the full vocabulary.
+            kwargs = dict(max_new_tokens=self.max_new_tokens, do_sample=False, num_beams=1)
+        else:
+            # top_k bounds the domain that top_p has to sort and renormalize.
+            kwargs = dict(
+                max_new_tokens=self.max_new_tokens,
+                do_sample=True,
+                temperature=self.temperature,
+                top_p=self.top_p,
+                top_k=self.top_k,
+            )
+        # transformers only supports assisted generation for batch_size == 1;
+        # batches decode without the draft model.
+        if self.assistant_model is not None and enc["input_ids"].shape[0] == 1:
+            kwargs["assistant_model"] = self.assistant_model
+            kwargs["num_assistant_tokens"] = 5
+        elif self.static_cache:
+            # generate() keeps the static cache on the model and resets it
+            # between calls instead of reallocating past_key_values. With it,
+            # generate() compiles only the fixed-shape decode step itself, and
+            # skips that for models that cannot be compiled (e.g. bnb-quantized).
+            kwargs["cache_implementation"] = "static"
+            kwargs["pad_token_id"] = self.tokenizer.eos_token_id
+        if streamer is not None:
+            kwargs["streamer"] = streamer
+        if stopping_criteria is not None:
+            kwargs["stopping_criteria"] = stopping_criteria
+        # inference_mode skips autograd version-counter and view tracking.
+        with torch.inference_mode():
+            return self.model.generate(**enc, **kwargs)
+
+    def _encode_prompt(self, prompt: str) -> torch.Tensor:
+        if self._system_prefix_ids is None:
+            enc = self.tokenizer(prompt, return_tensors="pt")
+            return enc["input_ids"].to(self.model.device)
+        if self._system_text is None:
+            # No chat template: keep the system prompt on its own line
+            user_text = "\n" + prompt
+        else:
+            # Render the user turn (and the assistant cue) with the template;
+            # only the text after the cached system turn is tokenized.
+            full = self.tokenizer.apply_chat_template(
+                [
+                    {"role": "system", "content": self._system_prompt},
+                    {"role": "user", "content": prompt},
+                ],
+                tokenize=False,
+                add_generation_prompt=True,
+            )
+            if not full.startswith(self._system_text):
+                # The template renders the system turn differently once a
+                # user turn follows, so the cached prefix does not apply.
+                enc = self.tokenizer(full, return_tensors="pt", add_special_tokens=False)
+                return enc["input_ids"].to(self.model.device)
+            user_text = full[len(self._system_text):]
+        enc = self.tokenizer(user_text, return_tensors="pt", add_special_tokens=False)
+        user_ids = enc["input_ids"].to(self.model.device)
+        return torch.cat([self._system_prefix_ids, user_ids], dim=-1)
+
+    def _prompt_inputs(self, prompt: str) -> dict:
+        input_ids = self._encode(prompt)
+        # generate() does not write into input_ids; the mask is rebuilt per call.
+        return {"input_ids": input_ids, "attention_mask": torch.ones_like(input_ids)}
+
+    def generate_text(self, prompt: str) -> str:
+        enc = self._prompt_inputs(prompt)
+        input_ids = enc["input_ids"]
+        if self.time_generation and torch.cuda.is_available():
+            # CUDA events time the GPU work without stalling the launch queue.
+            start_ev = torch.cuda.Event(enable_timing=True)
+            end_ev = torch.cuda.Event(enable_timing=True)
+            start_ev.record()
+            out = self._generate(enc)
+            end_ev.record()
+            end_ev.synchronize()
+            self.last_elapsed_ms = start_ev.elapsed_time(end_ev)
+        else:
+            out = self._generate(enc)
+        # Decode only the completion; the prompt tokens are already known.
+        generated = out[0, input_ids.shape[-1]:]
+        text = self.tokenizer.decode(generated, skip_special_tokens=True)
         return text.strip()
+
+    def generate_batch(self, prompts: list[str]) -> list[str]:
+        """Generate completions for several prompts with a single generate() call."""
+        if not prompts:
+            return []
+        # Left padding keeps every prompt ending at the same position, so the
+        # completions all start at the padded prompt length.
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.tokenizer.padding_side = "left"
+        if self._system_prefix_ids is None:
+            enc = self.tokenizer(prompts, return_tensors="pt", padding=True).to(self.model.device)
+        else:
+            enc = self._left_pad([self._encode(p)[0] for p in prompts])
+        out = self._generate(enc)
+        generated = out[:, enc["input_ids"].shape[-1]:]
+        texts = self.tokenizer.batch_decode(generated, skip_special_tokens=True)
+        return [text.strip() for text in texts]
+
+    def _left_pad(self, rows: list[torch.Tensor]) -> dict:
+        """Left-pad already encoded (system prefix + prompt) id rows into one
+        batch, so batched prompts are conditioned exactly like generate_text."""
+        pad_id = getattr(self.tokenizer, "pad_token_id", None)
+        if pad_id is None:
+            pad_id = self.tokenizer.eos_token_id
+        width = max(row.shape[-1] for row in rows)
+        input_ids = torch.full((len(rows), width), pad_id, dtype=rows[0].dtype, device=rows[0].device)
+        attention_mask = torch.zeros_like(input_ids)
+        for i, row in enumerate(rows):
+            input_ids[i, width - row.shape[-1]:] = row
+            attention_mask[i, width - row.shape[-1]:] = 1
+        return {"input_ids": input_ids, "attention_mask": attention_mask}
+
+    def generate_stream(self, prompt: str) -> Iterator[str]:
+        """Yield decoded text chunks while generation is still running."""
+        enc = self._prompt_inputs(prompt)
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        if self._stream_executor is None:
+            self._stream_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="textgen-stream")
+        stop = threading.Event()
+        future = self._stream_executor.submit(self._run_stream, enc, streamer, stop)
+        try:
+            yield from streamer
+        finally:
+            # A consumer that stops iterating early ends the run here, so the
+            # shared worker is free for the next stream.
+            stop.set()
+            future.result()  # wait for generate() and re-raise anything it failed with
+
+    def _run_stream(self, enc, streamer: TextIteratorStreamer, stop: threading.Event) -> None:
+        try:
+            self._generate(enc, streamer=streamer, stopping_criteria=StoppingCriteriaList([_StopOnEvent(stop)]))
+        except BaseException:
+            streamer.end()  # unblock the consumer before the error propagates
+            raise
@@ -1,6 +1,10 @@
 from __future__ import annotations
 import os
+import queue
 import tkinter as tk
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Dict
 from tkinter import ttk, messagebox, simpledialog, filedialog
 from .logger import Logger
 from .autofill import AutofillService
@@ -9,6 +13,10 @@ from .editor import FieldWalker
 from .project import ProjectPaths, Project
 from .utils import sanitize_project_name
 
+
+# How often the Tk thread drains the UI queue where no pipe wakeup exists
+_UI_POLL_MS = 50
+
 class StoryBuilderApp:
     def __init__(self):
         self.paths = ProjectPaths()
@@ -21,6 +29,14 @@ class StoryBuilderApp:
         self.dialog_runner: DialogRunner | None = None
         self.field_walker: FieldWalker | None = None
         self.project = Project(self.paths)
+        self._char_list_cache: tuple[str, int, list[str]] | None = None
+        # Shared pool for all background work; created in open_project
+        self._pool: ThreadPoolExecutor | None = None
+        # Worker -> Tk bridge: callbacks queued here run on the Tk thread
+        self._ui_queue: queue.Queue = queue.Queue()
+        self._wake_r: int | None = None
+        self._wake_w: int | None = None
+        self._ui_poll_id: str | None = None
 
     # --- App lifecycle ---
     def run(self):
@@ -50,6 +66,8 @@ class StoryBuilderApp:
         # Main window
         self.root = tk.Tk()
         self.root.title(f"Project: {os.path.basename(project_folder)}")
+        self._pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="story")
+        self._install_ui_bridge()
 
 
         # Toggle vars
@@ -61,10 +79,22 @@ class StoryBuilderApp:
         # Services
         log_file = os.path.join(project_folder, "debug.log")
         self.logger = Logger(self.debug_mode, log_file)
-        self.autofill = AutofillService(self.stub_mode)
+        self.autofill = AutofillService(
+            self.stub_mode,
+            cache_dir=os.path.join(project_folder, ".autofill_cache"),
+            executor=self._pool,
+            post_to_ui=self._post_to_ui,
+        )
         self.dialog_runner = DialogRunner(self.root, self.autofill, self.logger)
         self.field_walker = FieldWalker(self.dialog_runner, self.full_edit_mode, self.logger)
 
+        # Read templates and the character listing off the UI thread so the
+        # first click after launch doesn't pay the cold-cache I/O
+        self._submit(self._prewarm, project_folder)
+        # Load the model (and run its warmup) in the background as well, so
+        # the first Autofill click does not pay for it. Failures surface
+        # again on that click, where they are logged.
+        self._submit(self.autofill.preload)
 
         # Notebook UI
         notebook = ttk.Notebook(self.root)
@@ -74,7 +104,7 @@ class StoryBuilderApp:
         # World tab
         frame_world = ttk.Frame(notebook)
         notebook.add(frame_world, text="World & Story")
-        ttk.Button(frame_world, text="Edit World", command=lambda: self._edit_world(project_folder)).pack(padx=20, pady=20)
+        ttk.Button(frame_world, text="Edit World", command=partial(self._edit_world, project_folder)).pack(padx=20, pady=20)
 
 
         # Characters tab
@@ -82,7 +112,9 @@ class StoryBuilderApp:
         notebook.add(frame_chars, text="Characters")
 
 
-        self.listbox = tk.Listbox(frame_chars)
+        # Backed by a listvariable so a refresh hands Tk the whole list in one call
+        self._chars_var = tk.StringVar()
+        self.listbox = tk.Listbox(frame_chars, listvariable=self._chars_var)
         self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=10, pady=10)
 
 
@@ -90,12 +122,12 @@ class StoryBuilderApp:
         btn_frame.pack(side=tk.RIGHT, fill=tk.Y, padx=10, pady=10)
 
 
-        ttk.Button(btn_frame, text="New", command=lambda: [self._create_character(project_folder), self._refresh_character_list(project_folder)]).pack(fill=tk.X, pady=5)
-        ttk.Button(btn_frame, text="Edit", command=lambda: self._edit_character(project_folder)).pack(fill=tk.X, pady=5)
-        ttk.Button(btn_frame, text="Delete", command=lambda: self._delete_character(project_folder)).pack(fill=tk.X, pady=5)
+        ttk.Button(btn_frame, text="New", command=partial(self._new_and_refresh, project_folder)).pack(fill=tk.X, pady=5)
+        ttk.Button(btn_frame, text="Edit", command=partial(self._edit_character, project_folder)).pack(fill=tk.X, pady=5)
+        ttk.Button(btn_frame, text="Delete", command=partial(self._delete_character, project_folder)).pack(fill=tk.X, pady=5)
 
 
-        self._refresh_character_list(project_folder)
+        # The character list is filled by _prewarm once the listing is read
 
 
         # Toggles row
@@ -104,20 +136,131 @@ class StoryBuilderApp:
         ttk.Checkbutton(self.root, text="Debug logging (writes debug.log)", variable=self.debug_mode).pack(pady=5)
 
 
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
         self.root.mainloop()
 
+
+    def _on_close(self):
+        self._close_ui_bridge()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        if self.autofill is not None:
+            self.autofill.close()
+        if self.logger is not None:
+            self.logger.close() # flush pending debug.log lines
+        self.root.destroy()
+
+
+    def _submit(self, fn, *args, on_done=None, **kwargs) -> Future:
+        """Run *fn* on the shared pool. *on_done*, if given, receives the
+        finished Future on the Tk thread."""
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="story")
+        future = self._pool.submit(fn, *args, **kwargs)
+        if on_done is not None:
+            future.add_done_callback(lambda f: self._post_to_ui(on_done, f))
+        return future
+
+    def _prewarm(self, project_folder: str):
+        try:
+            # Runs on a pool thread: preload_templates never opens a dialog
+            self.project.preload_templates(
+                "story_template.json",
+                "character_template.json",
+                "story_template_prompt.json",
+                "character_template_prompt.json",
+            )
+            self._character_names(project_folder)
+        except Exception:
+            pass # best effort; the UI thread reads synchronously on a miss
+        finally:
+            self._post_to_ui(self._refresh_character_list, project_folder)
+
+
+    # --- Worker -> UI bridge ---
+    def _install_ui_bridge(self):
+        """Wake Tk through a pipe registered with createfilehandler so queued
+        callbacks run as soon as a worker posts them. Not available on
+        Windows, where the Tk thread polls the queue with root.after.
+        Posting never touches Tk, so it is safe before mainloop starts."""
+        try:
+            r, w = os.pipe()
+        except OSError:
+            self._poll_ui_queue()
+            return
+        try:
+            self.root.tk.createfilehandler(r, tk.READABLE, self._drain_ui_queue)
+        except (AttributeError, tk.TclError):
+            os.close(r)
+            os.close(w)
+            self._poll_ui_queue()
+            return
+        self._wake_r, self._wake_w = r, w
+
+
+    def _poll_ui_queue(self):
+        # Runs on the Tk thread only; reschedules itself until _close_ui_bridge
+        self._drain_ui_queue()
+        self._ui_poll_id = self.root.after(_UI_POLL_MS, self._poll_ui_queue)
+
+
+    def _close_ui_bridge(self):
+        if self._ui_poll_id is not None:
+            self.root.after_cancel(self._ui_poll_id)
+            self._ui_poll_id = None
+        if self._wake_r is not None:
+            r, w = self._wake_r, self._wake_w
+            self._wake_r = self._wake_w = None # later posts only enqueue
+            self.root.tk.deletefilehandler(r)
+            os.close(r)
+            os.close(w)
+
+
+    def _post_to_ui(self, callback, *args):
+        """Run *callback* on the Tk thread. Safe to call from any thread."""
+        if self.root is None:
+            callback(*args)
+            return
+        self._ui_queue.put((callback, args))
+        wake_w = self._wake_w
+        if wake_w is not None:
+            try:
+                os.write(wake_w, b"\0")
+            except OSError:
+                pass # bridge closed while shutting down
+
+
+    def _drain_ui_queue(self, *_):
+        if self._wake_r is not None:
+            os.read(self._wake_r, 512)
+        while True:
+            try:
+                callback, args = self._ui_queue.get_nowait()
+            except queue.Empty:
+                return
+            callback(*args)
+
+
+    def _ensure_doc(self, path: str, template_name: str) -> Dict[str, Any]:
+        """Return the document at *path*, creating it from a cleared template
+        if missing. A freshly created document is returned without re-reading
+        it."""
+        try:
+            return self.project.read_json(path)
+        except FileNotFoundError:
+            pass
+        cleared = self.project.clear_template(self.project.load_template(template_name))
+        self.project.save_json(cleared, path)
+        self.logger.log("_ensure_doc: created %s from template", os.path.basename(path))
+        return cleared
+
+
     # --- World ---
     def _edit_world(self, project_folder: str):
         self.dialog_runner.exit_early = False # reset per session
         story_path = self.project.story_path(project_folder)
-        if not os.path.exists(story_path):
-            template = self.project.load_template("story_template.json")
-            cleared = self.project.clear_template(template)
-            self.project.save_json(cleared, story_path)
-            self.logger.log("_edit_world: created Story.json from template")
-
-
-        data = self.project.read_json(story_path)
+        data = self._ensure_doc(story_path, "story_template.json")
         prompts = self.project.load_prompt_template("story_template_prompt.json")
         updated = self.field_walker.walk(data, prompts)
         self.project.save_json(updated, story_path)
@@ -132,23 +275,40 @@ class StoryBuilderApp:
 
 
     def _refresh_character_list(self, project_folder: str):
-        self.listbox.delete(0, tk.END)
-        for name in self.project.list_characters(project_folder):
-            self.listbox.insert(tk.END, name)
+        names = tuple(self._character_names(project_folder))
+        self._chars_var.set(names)
+
 
+    def _character_names(self, project_folder: str) -> list[str]:
+        """Sorted character names, cached by the Characters folder's mtime."""
+        d = self.project.characters_dir(project_folder)
+        mtime = os.stat(d).st_mtime_ns
+        cached = self._char_list_cache
+        if cached is not None and cached[0] == d and cached[1] == mtime:
+            return cached[2]
+        # File names are unique already; sort once per change, not per refresh
+        names = sorted(self.project.list_characters(project_folder))
+        self._char_list_cache = (d, mtime, names)
+        return names
 
-    def _create_character(self, project_folder: str):
+
+    def _create_character(self, project_folder: str) -> bool:
+        """Prompt for a name and edit that character; True if a new one was added."""
         name = simpledialog.askstring("New Character", "Enter character name:")
         if not name:
-            return
-        char_path = self.project.character_path(project_folder, name)
-        if not os.path.exists(char_path):
-            template = self.project.load_template("character_template.json")
-            cleared = self.project.clear_template(template)
-            self.project.save_json(cleared, char_path)
+            return False
+        is_new = name not in self._character_names(project_folder)
+        # _edit_character creates the file from the template if needed
+        self._edit_character(project_folder, preselected=name)
+        if is_new:
+            self._char_list_cache = None
+        return is_new
 
 
-        self._edit_character(project_folder, preselected=name)
+    def _new_and_refresh(self, project_folder: str):
+        # Only rebuild the list when a character was actually added
+        if self._create_character(project_folder):
+            self._refresh_character_list(project_folder)
 
 
     def _edit_character(self, project_folder: str, preselected: str | None = None):
@@ -159,14 +319,7 @@ class StoryBuilderApp:
 
 
         char_path = self.project.character_path(project_folder, name)
-        if not os.path.exists(char_path):
-            template = self.project.load_template("character_template.json")
-            cleared = self.project.clear_template(template)
-            self.project.save_json(cleared, char_path)
-            self.logger.log("_edit_character: created character from template")
-
-
-        data = self.project.read_json(char_path)
+        data = self._ensure_doc(char_path, "character_template.json")
         prompts = self.project.load_prompt_template("character_template_prompt.json")
         updated = self.field_walker.walk(data, prompts)
         self.project.save_json(updated, char_path)
@@ -179,7 +332,11 @@ class StoryBuilderApp:
         if not name:
             return
         path = self.project.character_path(project_folder, name)
-        if os.path.exists(path):
+        try:
             os.remove(path)
+        except FileNotFoundError:
+            pass
+        else:
+            self._char_list_cache = None
             messagebox.showinfo("Deleted", f"Character '{name}' removed!")
             self._refresh_character_list(project_folder)
\ No newline at end of file
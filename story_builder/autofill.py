@@ -1,7 +1,13 @@
 from __future__ import annotations
+import hashlib
+import os
 import random
+import shelve
 import string
-from typing import Optional
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Callable, List, Optional
 
 
 try:
@@ -10,10 +16,57 @@ except Exception:
     tg = None
 
 
+_FILLER_POOL_SIZE = 1024
+
+
 class AutofillService:
-    def __init__(self, stub_mode_var: Optional[object] = None, max_new_tokens: int = 50):
+    def __init__(
+        self,
+        stub_mode_var: Optional[object] = None,
+        max_new_tokens: int = 50,
+        batch_size: int = 16,
+        cache_dir: Optional[str] = None,
+        memory_cache_size: int = 512,
+        executor: Optional[Executor] = None,
+        post_to_ui: Optional[Callable[..., None]] = None,
+        model_path: Optional[str] = None,
+        temperature: float = 0.8,
+        top_p: float = 0.95,
+        top_k: int = 50,
+    ):
         self._stub_mode_var = stub_mode_var
         self.max_new_tokens = max_new_tokens
+        # Generation settings; all of them are part of the response cache key.
+        # model_path=None uses TextGenerator's default model.
+        self.model_path = model_path
+        self.temperature = temperature
+        self.top_p = top_p
+        self.top_k = top_k
+        self.batch_size = batch_size
+        # Filler text for stub/fallback mode, drawn up front and cycled through
+        self._stub_pool = [
+            "".join(random.choices(string.ascii_uppercase + string.digits, k=4)) for _ in range(_FILLER_POOL_SIZE)
+        ]
+        self._fallback_pool = [
+            "".join(random.choices(string.ascii_lowercase, k=12)) for _ in range(_FILLER_POOL_SIZE)
+        ]
+        self._stub_index = 0
+        self._fallback_index = 0
+        # Prompt -> response cache: an in-process LRU in front of an optional
+        # shelve file under cache_dir that survives restarts.
+        self.cache_dir = cache_dir
+        self._memory_cache: OrderedDict[str, str] = OrderedDict()
+        self._memory_cache_size = memory_cache_size
+        self._disk_cache: Optional[shelve.Shelf] = None
+        self._cache_lock = threading.Lock()
+        # Loading the model dominates latency, so one generator is kept per
+        # service. The lock also serializes generation across worker threads.
+        self._gen = None
+        self._gen_lock = threading.Lock()
+        # generate_async runs on `executor` (a private pool if None) and hands
+        # the finished Future to its callback through `post_to_ui`.
+        self._executor = executor
+        self._post_to_ui = post_to_ui
 
 
     def _stub_mode(self) -> bool:
@@ -23,12 +76,169 @@ class AutofillService:
             return False
 
 
-    def generate(self, prompt_text: str) -> str:
+    def _stub_text(self) -> str:
+        text = self._stub_pool[self._stub_index % _FILLER_POOL_SIZE]
+        self._stub_index += 1
+        return text
+
+
+    def _fallback_text(self) -> str:
+        # Fallback if text_generator isn't available
+        text = self._fallback_pool[self._fallback_index % _FILLER_POOL_SIZE]
+        self._fallback_index += 1
+        return text
+
+
+    # --- Response cache ---
+    def _cache_key(self, prompt_text: str) -> str:
+        # repr() of the tuple keeps the fields unambiguous (no concatenation
+        # collisions), and any settings change misses the persisted entries.
+        key = (
+            self.model_path or "",
+            self.temperature,
+            self.top_p,
+            self.top_k,
+            self.max_new_tokens,
+            prompt_text,
+        )
+        return hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+
+
+    def _open_disk_cache(self) -> Optional[shelve.Shelf]:
+        if self._disk_cache is None and self.cache_dir:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                self._disk_cache = shelve.open(os.path.join(self.cache_dir, "responses"))
+            except Exception:
+                self.cache_dir = None # unusable; stay memory-only
+        return self._disk_cache
+
+
+    def _cache_get(self, key: str) -> Optional[str]:
+        with self._cache_lock:
+            if key in self._memory_cache:
+                self._memory_cache.move_to_end(key)
+                return self._memory_cache[key]
+            disk = self._open_disk_cache()
+            if disk is not None and key in disk:
+                value = disk[key]
+                self._remember(key, value)
+                return value
+        return None
+
+
+    def _cache_put(self, key: str, value: str) -> None:
+        with self._cache_lock:
+            self._remember(key, value)
+            disk = self._open_disk_cache()
+            if disk is not None:
+                disk[key] = value
+                disk.sync()
+
+
+    def _remember(self, key: str, value: str) -> None:
+        self._memory_cache[key] = value
+        self._memory_cache.move_to_end(key)
+        while len(self._memory_cache) > self._memory_cache_size:
+            self._memory_cache.popitem(last=False)
+
+
+    def close(self) -> None:
+        """Release the generator (and its GPU memory) and close the disk cache."""
+        with self._gen_lock:
+            self._gen = None
+        with self._cache_lock:
+            if self._disk_cache is not None:
+                self._disk_cache.close()
+                self._disk_cache = None
+
+
+    def _generator(self):
+        # Caller holds self._gen_lock
+        if self._gen is None:
+            kwargs = {"model_path": self.model_path} if self.model_path else {}
+            self._gen = tg.TextGenerator(
+                max_new_tokens=self.max_new_tokens,
+                temperature=self.temperature,
+                top_p=self.top_p,
+                top_k=self.top_k,
+                **kwargs,
+            )
+        # Read per call, so sampling settings can change without a reload
+        self._gen.max_new_tokens = self.max_new_tokens
+        self._gen.temperature = self.temperature
+        self._gen.top_p = self.top_p
+        self._gen.top_k = self.top_k
+        return self._gen
+
+
+    def preload(self) -> None:
+        """Build the generator (loading the model and running its warmup)
+        ahead of the first generate() call. Blocks; call it on a worker."""
+        if tg is None:
+            return
+        with self._gen_lock:
+            self._generator()
+
+
+    # --- Generation ---
+    def generate(self, prompt_text: str, cache_bust: bool = False) -> str:
+        return self._generate(prompt_text, cache_bust, self._stub_mode())
+
+
+    def _generate(self, prompt_text: str, cache_bust: bool, stub_mode: bool) -> str:
+        # stub_mode is passed in, not read here: this runs on worker threads
+        # and the stub-mode var is a Tk variable.
+        if stub_mode:
+            return self._stub_text()
+        if tg is None:
+            return self._fallback_text()
+        key = self._cache_key(prompt_text)
+        if not cache_bust:
+            cached = self._cache_get(key)
+            if cached is not None:
+                return cached
+        with self._gen_lock:
+            out = self._generator().generate_text(prompt_text)
+        out = out or "" # TextGenerator already returns stripped text
+        self._cache_put(key, out)
+        return out
+
+
+    def generate_batch(self, prompts: List[str], cache_bust: bool = False) -> List[str]:
+        """Generate one completion per prompt, sending up to batch_size prompts
+        through a single padded generate() call. Cached prompts are skipped."""
         if self._stub_mode():
-            return "".join(random.choices(string.ascii_uppercase + string.digits, k=4))
+            return [self._stub_text() for _ in prompts]
         if tg is None:
-        # Fallback if text_generator isn't available
-            return "".join(random.choices(string.ascii_lowercase, k=12))
-        gen = tg.TextGenerator(max_new_tokens=self.max_new_tokens)
-        out = gen.generate_text(prompt_text)
-        return (out or "").strip()
\ No newline at end of file
+            return [self._fallback_text() for _ in prompts]
+        keys = [self._cache_key(p) for p in prompts]
+        results: List[Optional[str]] = [None if cache_bust else self._cache_get(k) for k in keys]
+        missing = [i for i, r in enumerate(results) if r is None]
+        if missing:
+            for start in range(0, len(missing), self.batch_size):
+                chunk = missing[start:start + self.batch_size]
+                with self._gen_lock:
+                    outs = self._generator().generate_batch([prompts[i] for i in chunk])
+                for i, out in zip(chunk, outs):
+                    results[i] = out or ""
+                    self._cache_put(keys[i], results[i])
+        return results
+
+
+    def generate_async(self, prompt_text: str, callback: Callable[[Future], None], cache_bust: bool = False) -> Future:
+        """Run generate() on a worker thread; *callback* receives the finished
+        Future (via post_to_ui when set, so it runs on the Tk thread)."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="autofill")
+        # Read the Tk stub-mode var here, on the calling (UI) thread
+        future = self._executor.submit(self._generate, prompt_text, cache_bust, self._stub_mode())
+
+        def _deliver(done: Future) -> None:
+            if self._post_to_ui is not None:
+                self._post_to_ui(callback, done)
+            else:
+                callback(done)
+
+        future.add_done_callback(_deliver)
+        return future
@@ -1,7 +1,7 @@
 from __future__ import annotations
 import tkinter as tk
 from tkinter import messagebox
-from typing import Dict, Optional
+from typing import Dict, Mapping, Optional
 
 from .autofill import AutofillService
 from .logger import Logger
@@ -14,6 +14,47 @@ class DialogRunner:
         self.autofill = autofill
         self.logger = logger
         self.exit_early = False
+        # One withdrawn Toplevel is built on first use and reconfigured for
+        # every field instead of recreating its widgets per dialog.
+        self._dialog: Optional[tk.Toplevel] = None
+        self._label: Optional[tk.Label] = None
+        self._entry: Optional[tk.Entry] = None
+        self._autofill_button: Optional[tk.Button] = None
+        self._done: Optional[tk.IntVar] = None
+        # State of the field currently shown; _request changes whenever the
+        # field does, so late autofill results for an old field are dropped.
+        self._field: Dict[str, object] = {}
+        self._request = 0
+        # Set while a field is shown; the dialog is modal, and ask_field
+        # refuses to nest so the shared state above cannot be overwritten.
+        self._active = False
+
+
+    def _build_dialog(self) -> None:
+        dialog = tk.Toplevel(self.root)
+        dialog.withdraw()
+        dialog.transient(self.root)
+
+        self._label = tk.Label(dialog, justify=tk.LEFT, wraplength=520)
+        self._label.pack(padx=10, pady=10)
+
+        self._entry = tk.Entry(dialog, width=70)
+        self._entry.pack(padx=10, pady=5)
+
+        tk.Button(dialog, text="OK", command=self._on_ok).pack(side=tk.LEFT, padx=5, pady=10)
+        tk.Button(dialog, text="Skip", command=self._on_cancel).pack(side=tk.LEFT, padx=5, pady=10)
+        self._autofill_button = tk.Button(dialog, text="Autofill", command=self._on_autofill)
+        self._autofill_button.pack(side=tk.LEFT, padx=5, pady=10)
+        tk.Button(dialog, text="Exit", command=self._on_exit).pack(side=tk.RIGHT, padx=5, pady=10)
+
+        # Closing acts like Skip (does not set exit_early)
+        dialog.protocol("WM_DELETE_WINDOW", self._on_cancel)
+        # tkwait variable does not return when its window dies (e.g. the app
+        # closing with a field open), so destroying the dialog ends the wait.
+        dialog.bind("<Destroy>", self._on_destroy)
+
+        self._done = tk.IntVar(dialog, value=0)
+        self._dialog = dialog
 
 
     def ask_field(
@@ -22,82 +63,132 @@ class DialogRunner:
         key: str,
         suggestion: Optional[str],
         prompt_instruction: Optional[str] = None,
-        context: Optional[Dict[str, object]] = None,
+        context: Optional[Mapping[str, object]] = None,
     ) -> str:
         if suggestion is None:
             suggestion = ""
 
+        if self._active:
+            self.logger.log("ask_field -> %s refused: another field is open", key)
+            return suggestion
 
-        dialog = tk.Toplevel(self.root)
-        dialog.title(title)
-
-        prompt_instruction = prompt_instruction or ""
-        context = context or {}
+        if self._dialog is None or not self._dialog.winfo_exists():
+            self._build_dialog()
+        dialog = self._dialog
 
+        self._request += 1
+        self._field = {
+            "key": key,
+            "suggestion": suggestion,
+            "instruction": prompt_instruction or "",
+            "context": context or {},
+            "value": suggestion,
+            "autofills": 0,
+        }
 
         label_text = f"{key} (current: {suggestion})"
-        self.logger.log(f"ask_field -> {label_text}")
-        tk.Label(dialog, text=label_text, justify=tk.LEFT, wraplength=520).pack(padx=10, pady=10)
-
-
-        entry = tk.Entry(dialog, width=70)
-        entry.pack(padx=10, pady=5)
-        entry.insert(0, suggestion)
-
-
-        result = {"value": suggestion}
-
-
-        def on_ok():
-            result["value"] = entry.get() or ""
-            self.logger.log(f"ask_field OK -> {key} = {result['value']!r}")
-            dialog.destroy()
-
-
-        def on_cancel():
-            result["value"] = suggestion or ""
-            self.logger.log(f"ask_field SKIP -> {key} keeps {result['value']!r}")
-            dialog.destroy()
-
-
-        def on_exit():
-            self.exit_early = True
-            self.logger.log("ask_field EXIT pressed -> exit_early=True")
-            dialog.destroy()
-
-
-        def on_autofill():
-            prompt = self.build_prompt(
-                key=key,
-                current_value=entry.get().strip() or suggestion,
-                instruction=prompt_instruction,
-                context=context,
-            )
-            val = self.autofill.generate(prompt)
-            entry.delete(0, tk.END)
-            entry.insert(0, val)
-            self.logger.log(f"ask_field AUTOFILL -> {key} = {val!r}")
-
-
-        tk.Button(dialog, text="OK", command=on_ok).pack(side=tk.LEFT, padx=5, pady=10)
-        tk.Button(dialog, text="Skip", command=on_cancel).pack(side=tk.LEFT, padx=5, pady=10)
-        tk.Button(dialog, text="Autofill", command=on_autofill).pack(side=tk.LEFT, padx=5, pady=10)
-        tk.Button(dialog, text="Exit", command=on_exit).pack(side=tk.RIGHT, padx=5, pady=10)
-
-
-        # Closing acts like Skip (does not set exit_early)
-        dialog.protocol("WM_DELETE_WINDOW", on_cancel)
-
-
-        dialog.wait_window()
-        return result["value"] or ""
+        self.logger.log("ask_field -> %s", label_text)
+        dialog.title(title)
+        self._label.config(text=label_text)
+        self._entry.delete(0, tk.END)
+        self._entry.insert(0, suggestion)
+        self._autofill_button.config(state=tk.NORMAL)
+
+        field = self._field
+        self._active = True
+        try:
+            dialog.deiconify()
+            # Modal: clicks in the main window cannot start another edit
+            dialog.wait_visibility()
+            dialog.grab_set()
+            dialog.wait_variable(self._done)
+        finally:
+            self._active = False
+            try:
+                if dialog.winfo_exists():
+                    dialog.grab_release()
+                    dialog.withdraw()
+            except tk.TclError:
+                pass # the whole app was destroyed while the field was open
+        return field["value"] or ""
+
+
+    def _finish(self) -> None:
+        self._request += 1 # any autofill still running is now stale
+        self._done.set(self._done.get() + 1)
+
+
+    def _on_ok(self) -> None:
+        key = self._field["key"]
+        self._field["value"] = self._entry.get() or ""
+        self.logger.log("ask_field OK -> %s = %r", key, self._field["value"])
+        self._finish()
+
+
+    def _on_cancel(self) -> None:
+        key = self._field["key"]
+        self._field["value"] = self._field["suggestion"] or ""
+        self.logger.log("ask_field SKIP -> %s keeps %r", key, self._field["value"])
+        self._finish()
+
+
+    def _on_exit(self) -> None:
+        self.exit_early = True
+        self.logger.log("ask_field EXIT pressed -> exit_early=True")
+        self._finish()
+
+
+    def _on_destroy(self, event) -> None:
+        if event.widget is not self._dialog or not self._active:
+            return # a child widget, or no field is waiting
+        self.exit_early = True # nothing left to show further fields in
+        self._field["value"] = self._field["suggestion"] or ""
+        self.logger.log("ask_field DESTROYED -> %s keeps %r", self._field["key"], self._field["value"])
+        self._finish()
+
+
+    def _on_autofill(self) -> None:
+        field = self._field
+        prompt = self.build_prompt(
+            key=field["key"],
+            current_value=self._entry.get().strip() or field["suggestion"],
+            instruction=field["instruction"],
+            context=field["context"],
+        )
+        # Generate off the Tk thread; the result is applied on the Tk thread.
+        # The button stays disabled meanwhile so clicks cannot queue repeats.
+        self._autofill_button.config(state=tk.DISABLED)
+        # The first click may reuse a cached suggestion; clicking again asks
+        # for a fresh one instead of returning the same cached text.
+        cache_bust = field["autofills"] > 0
+        field["autofills"] += 1
+        request = self._request
+        self.autofill.generate_async(
+            prompt, lambda future: self._on_autofill_done(request, future), cache_bust=cache_bust
+        )
+
+
+    def _on_autofill_done(self, request: int, future) -> None:
+        if request != self._request or self._dialog is None or not self._dialog.winfo_exists():
+            return # field finished (or dialog closed) while generating
+        key = self._field["key"]
+        self._autofill_button.config(state=tk.NORMAL)
+        try:
+            val = future.result()
+        except Exception as exc:
+            self.logger.log("ask_field AUTOFILL failed -> %s: %r", key, exc)
+            return
+        # Both edits land before Tk's next idle pass, so this repaints once
+        self._entry.delete(0, tk.END)
+        self._entry.insert(0, val)
+        self.logger.log("ask_field AUTOFILL -> %s = %r", key, val)
 
     @staticmethod
     def build_prompt(
         key: str,
         current_value: str,
         instruction: str,
-        context: Optional[Dict[str, object]] = None,
+        context: Optional[Mapping[str, object]] = None,
     ) -> str:
         lines = [
             "You are a story writing assistant and I want to build an immersive story outline.",
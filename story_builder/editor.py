@@ -1,11 +1,37 @@
 from __future__ import annotations
-from typing import Any, Dict
+import re
+from collections import ChainMap
+from typing import Any, Dict, Mapping, Tuple
 
 from .dialogs import DialogRunner
 from .logger import Logger
 from .utils import format_field_label, summarize_value_for_prompt
 
 
+# List input is accepted comma- or line-separated, optionally bulleted
+_LIST_SPLIT = re.compile(r"[\r\n,]+")
+# Only a marker followed by whitespace is a bullet; "-5 gold" keeps its sign
+_BULLET_RE = re.compile(r"^\s*[-*\u2022]\s+")
+
+# Normalized prompt node: key -> (instruction, child prompts)
+PromptTree = Dict[str, Tuple[str, "PromptTree"]]
+_NO_PROMPT: Tuple[str, PromptTree] = ("", {})
+
+
+def _normalize_prompts(prompt_data: Any) -> PromptTree:
+    """Convert raw prompt JSON into (instruction, children) pairs once, so the
+    walk never has to type-check prompt values per field."""
+    if not isinstance(prompt_data, dict):
+        return {}
+    normalized: PromptTree = {}
+    for key, p in prompt_data.items():
+        if isinstance(p, dict):
+            normalized[key] = ("", _normalize_prompts(p))
+        elif isinstance(p, str):
+            normalized[key] = (p, {})
+    return normalized
+
+
 class FieldWalker:
     """Walks a nested dict of strings/lists, prompting the user for empty fields.
     Keeps filled values unless Full Edit Mode is enabled.
@@ -16,6 +42,8 @@ class FieldWalker:
         self.dialog = dialog
         self.full_edit_mode_var = full_edit_mode_var
         self.logger = logger
+        # Snapshot of _full_edit() for the current walk (read once, not per field)
+        self._full_edit_cached = False
 
     def _full_edit(self) -> bool:
         try:
@@ -26,42 +54,52 @@ class FieldWalker:
 
 
     def walk(self, data: Dict[str, Any], prompt_data: Dict[str, Any]) -> Dict[str, Any]:
-        if not isinstance(prompt_data, dict):
-            prompt_data = {}
-        self.logger.log(f"FieldWalker.walk: start (full_edit={self._full_edit()})")
-        self._walk_dict(data, prompt_data, title_key=None)
+        prompts = _normalize_prompts(prompt_data)
+        self._full_edit_cached = self._full_edit()
+        self.logger.log("FieldWalker.walk: start (full_edit=%s)", self._full_edit_cached)
+        self._walk_dict(data, prompts, title_key=None)
         return data
     
-    def _walk_dict(self, data: Dict[str, Any], prompt_data: Dict[str, Any], title_key: str | None):
-        for key, value in list(data.items()):
+    def _walk_dict(self, data: Dict[str, Any], prompts: PromptTree, title_key: str | None):
+        # Depth-first over nested dicts with an explicit stack of item
+        # iterators, so deep schemas cost no Python frames per level. Only
+        # existing keys are reassigned, so the live items() views stay valid.
+        stack = [(data, prompts, iter(data.items()))]
+        while stack:
+            container, prompts, items = stack[-1]
+            item = next(items, None)
+            if item is None:
+                stack.pop()
+                continue
+            key, value = item
+
             if self.dialog.exit_early:
                 self.logger.log("FieldWalker: exit_early flagged -> stop walking")
                 return
 
 
-            p = prompt_data.get(key, {}) if isinstance(prompt_data, dict) else {}
+            instruction, child_prompts = prompts.get(key, _NO_PROMPT)
 
 
             if value is None:
                 value = ""
-                data[key] = value
+                container[key] = value
 
 
-            self.logger.log(f"FieldWalker: key={key!r}, type={type(value).__name__}")
+            self.logger.log("FieldWalker: key=%r, type=%s", key, type(value).__name__)
 
 
             if isinstance(value, dict):
-                self._walk_dict(value, p if isinstance(p, dict) else {}, title_key=key)
+                stack.append((value, child_prompts, iter(value.items())))
             elif isinstance(value, list):
-                filled = self._prompt_list(key, value, p, data)
-                data[key] = filled
+                filled = self._prompt_list(key, value, instruction, child_prompts, container)
+                container[key] = filled
             else:
-                data[key] = self._prompt_string(key, str(value), p, data)
+                container[key] = self._prompt_string(key, str(value), instruction, container)
 
 
-    def _prompt_string(self, key: str, value: str, p, container: Dict[str, Any]) -> str:
-        if value.strip() == "" or self._full_edit():
-            instruction = p if isinstance(p, str) else ""
+    def _prompt_string(self, key: str, value: str, instruction: str, container: Dict[str, Any]) -> str:
+        if value.strip() == "" or self._full_edit_cached:
             context = self._context_snapshot(container, exclude_key=key)
             user_input = self.dialog.ask_field(
                 self._title(key),
@@ -70,17 +108,18 @@ class FieldWalker:
                 prompt_instruction=instruction,
                 context=context,
             )
-            self.logger.log(f"string filled -> {key} = {user_input!r}")
+            self.logger.log("string filled -> %s = %r", key, user_input)
             return user_input or ""
         else:
-            self.logger.log(f"string kept -> {key} = {value!r}")
+            self.logger.log("string kept -> %s = %r", key, value)
             return value
 
 
-    def _prompt_list(self, key: str, value_list: list, p, container: Dict[str, Any]) -> list:
-        instruction = p if isinstance(p, str) else ""
-        context = self._context_snapshot(container, exclude_key=key)
-        if not value_list or self._full_edit():
+    def _prompt_list(
+        self, key: str, value_list: list, instruction: str, item_prompts: PromptTree, container: Dict[str, Any]
+    ) -> list:
+        if not value_list or self._full_edit_cached:
+            context = self._context_snapshot(container, exclude_key=key)
             placeholder = instruction or f"Enter values for {format_field_label(key)}, comma-separated"
             user_input = self.dialog.ask_field(
                 self._title(key),
@@ -89,10 +128,14 @@ class FieldWalker:
                 prompt_instruction=placeholder,
                 context=context,
             )
-            new = [x.strip() for x in user_input.split(",") if x.strip()] if user_input else []
-            self.logger.log(f"list fill -> {key} = {new}")
+            new = self._parse_list_input(user_input)
+            self.logger.log("list fill -> %s = %s", key, new)
             return new
 
+        # Sibling context and item summaries are only computed once an item
+        # actually needs a dialog, then shared by the rest of the list.
+        context = None
+        summaries = None
         new_list = []
         for idx, v in enumerate(value_list):
             if self.dialog.exit_early:
@@ -101,7 +144,10 @@ class FieldWalker:
                 v = ""
             if isinstance(v, str):
                 if v.strip() == "":
-                    item_context = self._list_item_context(key, context, value_list, idx)
+                    if context is None:
+                        context = self._context_snapshot(container, exclude_key=key)
+                        summaries = [summarize_value_for_prompt(item) for item in value_list]
+                    item_context = self._list_item_context(key, context, summaries, idx)
                     user_input = self.dialog.ask_field(
                         self._title(f"{key}[{idx}]"),
                         f"{key}[{idx}]",
@@ -109,17 +155,22 @@ class FieldWalker:
                         prompt_instruction=instruction,
                         context=item_context,
                     )
-                    self.logger.log(f"list item filled -> {key}[{idx}] = {user_input!r}")
+                    self.logger.log("list item filled -> %s[%d] = %r", key, idx, user_input)
                     new_list.append(user_input or "")
                 else:
                     new_list.append(v)
-                    self.logger.log(f"list item kept -> {key}[{idx}] = {v!r}")
+                    self.logger.log("list item kept -> %s[%d] = %r", key, idx, v)
             elif isinstance(v, dict):
                 # Recurse dict inside list
-                self._walk_dict(v, p if isinstance(p, dict) else {}, title_key=f"{key}[{idx}]")
+                self._walk_dict(v, item_prompts, title_key=f"{key}[{idx}]")
                 new_list.append(v)
+                if summaries is not None:
+                    summaries[idx] = summarize_value_for_prompt(v) # walked in place
             else:
-                item_context = self._list_item_context(key, context, value_list, idx)
+                if context is None:
+                    context = self._context_snapshot(container, exclude_key=key)
+                    summaries = [summarize_value_for_prompt(item) for item in value_list]
+                item_context = self._list_item_context(key, context, summaries, idx)
                 user_input = self.dialog.ask_field(
                     self._title(f"{key}[{idx}]"),
                     f"{key}[{idx}]",
@@ -133,6 +184,13 @@ class FieldWalker:
         return new_list
 
 
+    @staticmethod
+    def _parse_list_input(text: str) -> list:
+        if not text:
+            return []
+        items = (_BULLET_RE.sub("", part).strip() for part in _LIST_SPLIT.split(text))
+        return [item for item in items if item]
+
     @staticmethod
     def _title(key: str) -> str:
         return f"Edit: {key}"
@@ -147,15 +205,9 @@ class FieldWalker:
                 context[key] = summary
         return context
 
-    def _list_item_context(self, key: str, base_context: Dict[str, str], value_list: list, idx: int) -> Dict[str, str]:
-        item_context = dict(base_context)
-        existing = []
-        for i, item in enumerate(value_list):
-            if i == idx:
-                continue
-            summary = summarize_value_for_prompt(item)
-            if summary:
-                existing.append(summary)
-        if existing:
-            item_context[f"Other {format_field_label(key)} entries"] = ", ".join(existing)
-        return item_context
+    def _list_item_context(self, key: str, base_context: Dict[str, str], summaries: list, idx: int) -> Mapping[str, str]:
+        # Layer the one extra entry over the shared base instead of copying it
+        existing = [summary for i, summary in enumerate(summaries) if i != idx and summary]
+        if not existing:
+            return base_context
+        return ChainMap({f"Other {format_field_label(key)} entries": ", ".join(existing)}, base_context)
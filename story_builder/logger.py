@@ -1,12 +1,18 @@
 from __future__ import annotations
+import queue
+import threading
 from typing import Optional
 
 class Logger:
-    """Lightweight logger that can be toggled via a tk.BooleanVar-like object."""
+    """Lightweight logger that can be toggled via a tk.BooleanVar-like object.
+    File writes happen on a background thread so log calls never block on disk."""
 
     def __init__(self, enabled_var: Optional[object] = None, log_file: Optional[str] = None):
         self._enabled_var = enabled_var
         self.log_file = log_file
+        self._queue: queue.Queue = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
 
     def enabled(self) -> bool:
         try:
@@ -14,13 +20,60 @@ class Logger:
         except Exception:
             return False
 
-    def log(self, msg: str) -> None:
-        if not self.enabled():
+    def log(self, msg: str, *args: object) -> None:
+        """Log *msg*, %-formatted with *args* only when logging is enabled.
+        Pass values as args rather than pre-formatting an f-string, so a
+        disabled logger never pays for the formatting (or repr of large values)."""
+        if self._enabled_var is None or not self.enabled():
             return
+        if args:
+            msg = msg % args
         print(msg)
         if self.log_file:
-            try:
-                with open(self.log_file, "a", encoding="utf-8") as f:
-                    f.write(str(msg) + "\n")
-            except Exception:
-                pass
+            self._ensure_writer()
+            self._queue.put(str(msg))
+
+    def close(self) -> None:
+        """Flush pending lines and stop the writer thread."""
+        with self._writer_lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._queue.put(None)
+            writer.join(timeout=2)
+
+    def _ensure_writer(self) -> None:
+        if self._writer is not None:
+            return
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="debug-log", daemon=True)
+                self._writer.start()
+
+    def _write_loop(self) -> None:
+        # The file is opened once and kept open for the writer's lifetime;
+        # each batch is flushed so debug.log stays current.
+        fh = None
+        try:
+            while True:
+                lines = [self._queue.get()]
+                # Batch whatever queued up while the last write was in flight
+                while True:
+                    try:
+                        lines.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                stop = None in lines
+                lines = [line for line in lines if line is not None]
+                if lines:
+                    try:
+                        if fh is None:
+                            fh = open(self.log_file, "a", encoding="utf-8", buffering=8192)
+                        fh.write("\n".join(lines) + "\n")
+                        fh.flush()
+                    except Exception:
+                        pass
+                if stop:
+                    return
+        finally:
+            if fh is not None:
+                fh.close()
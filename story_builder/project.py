@@ -1,9 +1,50 @@
 from __future__ import annotations
+import functools
+import mmap
 import os
 import json
 from typing import Any, Dict
 from tkinter import messagebox
 
+try:
+    import orjson # optional fast JSON backend
+except ImportError:
+    orjson = None
+
+
+# Files at least this large are parsed straight from a read-only mapping
+_MMAP_THRESHOLD = 256 * 1024
+
+# Directories already created this session; skips a mkdir syscall per call
+_ENSURED_DIRS: set[str] = set()
+
+
+def _ensure_dir(path: str) -> str:
+    if path not in _ENSURED_DIRS:
+        os.makedirs(path, exist_ok=True)
+        _ENSURED_DIRS.add(path)
+    return path
+
+
+def _read_json_file(path: str) -> Dict[str, Any]:
+    if orjson is not None:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < _MMAP_THRESHOLD:
+                return orjson.loads(f.read())
+            # Skip copying a large file into an intermediate bytes object
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                with memoryview(mm) as view:
+                    return orjson.loads(view)
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@functools.lru_cache(maxsize=64)
+def _load_template_file(path: str, mtime_ns: int) -> Dict[str, Any]:
+    # Keyed on mtime so an edited template is parsed again on its next load
+    return _read_json_file(path)
+
 
 class ProjectPaths:
     """Holds and prepares common paths (keeps original relative layout)."""
@@ -11,12 +52,11 @@ class ProjectPaths:
 
     def __init__(self):
         # Keep compatibility with your original two-levels-up layout
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        # __file__ is already absolute, so normpath avoids abspath's getcwd()
+        base_dir = os.path.normpath(os.path.join(os.path.dirname(__file__), os.pardir))
         self.base_dir = base_dir
-        self.templates_dir = os.path.join(base_dir, "json_templates")
-        self.projects_root = os.path.join(base_dir, "json_projects")
-        os.makedirs(self.templates_dir, exist_ok=True)
-        os.makedirs(self.projects_root, exist_ok=True)
+        self.templates_dir = _ensure_dir(os.path.join(base_dir, "json_templates"))
+        self.projects_root = _ensure_dir(os.path.join(base_dir, "json_projects"))
 
 
     def project_folder(self, name: str) -> str:
@@ -31,42 +71,81 @@ class Project:
     # --- JSON IO ---
     def save_json(self, data: Dict[str, Any], path: str) -> None:
         os.makedirs(os.path.dirname(path), exist_ok=True)
+        if orjson is not None:
+            with open(path, "wb") as f:
+                # NON_STR_KEYS matches json.dump, which stringifies int keys
+                f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+            return
+        # Encode up front: json.dump() issues one write() per encoded chunk
+        text = json.dumps(data, indent=2, ensure_ascii=False)
         with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.write(text)
 
 
     def read_json(self, path: str) -> Dict[str, Any]:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return _read_json_file(path)
 
 
 # --- Templates ---
+    # Templates are parsed once per (path, mtime) and the parsed dicts are
+    # shared between callers, so they must be treated as read-only;
+    # clear_template() builds a new dict rather than mutating.
     def load_template(self, filename: str) -> Dict[str, Any]:
         path = os.path.join(self.paths.templates_dir, filename)
-        if not os.path.exists(path):
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
             messagebox.showerror("Missing Template", f"Template '{filename}' not found in {self.paths.templates_dir}.")
             return {}
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return _load_template_file(path, mtime_ns)
 
 
     def load_prompt_template(self, filename: str) -> Dict[str, Any]:
         path = os.path.join(self.paths.templates_dir, filename)
-        if not os.path.exists(path):
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
             return {}
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return _load_template_file(path, mtime_ns)
+
+
+    def preload_templates(self, *filenames: str) -> None:
+        """Parse templates into the shared cache without any UI, so it is
+        safe off the Tk thread; missing files are left for load_template()
+        to report."""
+        for filename in filenames:
+            path = os.path.join(self.paths.templates_dir, filename)
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            _load_template_file(path, mtime_ns)
+
+
+    def invalidate_templates(self) -> None:
+        """Drop all cached templates. Edited files are picked up by mtime
+        anyway; this only forces a re-parse."""
+        _load_template_file.cache_clear()
 
 
     def clear_template(self, data: Any) -> Any:
-        if isinstance(data, dict):
-            return {k: self.clear_template(v) for k, v in data.items()}
-        elif isinstance(data, list):
-            return []
-        elif isinstance(data, str):
-            return ""
-        else:
-            return ""
+        if not isinstance(data, dict):
+            return [] if isinstance(data, list) else ""
+        # Iterative copy: each nested dict is filled in place with its keys
+        # in the template's order, without a call frame per level.
+        cleared: Dict[str, Any] = {}
+        stack = [(data, cleared)]
+        while stack:
+            src, dst = stack.pop()
+            for k, v in src.items():
+                if isinstance(v, dict):
+                    dst[k] = child = {}
+                    stack.append((v, child))
+                elif isinstance(v, list):
+                    dst[k] = []
+                else:
+                    dst[k] = ""
+        return cleared
 
 
     # --- Story paths ---
@@ -76,6 +155,8 @@ class Project:
 
     # --- Characters ---
     def characters_dir(self, project_folder: str) -> str:
+        # Not memoized: the folder can be deleted or recreated while the app
+        # runs, and callers stat/scan it right after this returns.
         d = os.path.join(project_folder, "Characters")
         os.makedirs(d, exist_ok=True)
         return d
@@ -87,4 +168,6 @@ class Project:
 
     def list_characters(self, project_folder: str):
         d = self.characters_dir(project_folder)
-        return [f[:-5] for f in os.listdir(d) if f.endswith(".json")]
\ No newline at end of file
+        # scandir yields the entry type with the name, no per-file stat needed
+        with os.scandir(d) as it:
+            return [e.name[:-5] for e in it if e.name.endswith(".json") and e.is_file()]
\ No newline at end of file
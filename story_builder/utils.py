@@ -1,43 +1,96 @@
 from __future__ import annotations
 
-import re
+import functools
+import string
+from itertools import repeat
 from typing import Any
 
 
+_NAME_CHARS = frozenset(string.ascii_letters + string.digits + "_-")
+
+
+class _SanitizeTable(dict):
+    """str.translate table mapping every code point outside _NAME_CHARS to
+    "_"; entries are filled in on first lookup, so it covers all of Unicode."""
+
+    def __missing__(self, code: int) -> int:
+        value = code if chr(code) in _NAME_CHARS else ord("_")
+        self[code] = value
+        return value
+
+
+_SANITIZE_TABLE = _SanitizeTable()
+_LABEL_TABLE = str.maketrans({"_": " ", "[": " ", "]": " "})
+
+
+@functools.lru_cache(maxsize=1024)
 def sanitize_project_name(name: str) -> str:
     """Remove invalid filename characters."""
-    return re.sub(r"[^A-Za-z0-9_-]", "_", name)
+    return name.translate(_SANITIZE_TABLE)
 
 
+@functools.lru_cache(maxsize=256)
 def format_field_label(name: str) -> str:
-    """Convert an internal key like "story_preferences" into a friendly label."""
+    """Convert an internal key like "story_preferences" into a friendly label.
+    Keys repeat across every prompt and summary, so labels are memoized."""
 
     if not name:
         return ""
 
-    cleaned = name.replace("_", " ").replace("[", " ").replace("]", " ")
-    cleaned = " ".join(cleaned.split())
+    cleaned = " ".join(name.translate(_LABEL_TABLE).split())
     if not cleaned:
         return ""
     return cleaned[0].upper() + cleaned[1:]
 
 
-def summarize_value_for_prompt(value: Any) -> str:
-    """Produce a readable summary for context shown to the language model."""
-
+def _summarize_scalar(value: Any) -> str | None:
+    """Summary of a non-container value, or None for lists/tuples/sets/dicts."""
     if value is None:
         return ""
     if isinstance(value, str):
         return value.strip()
-    if isinstance(value, (list, tuple, set)):
-        parts = [summarize_value_for_prompt(v) for v in value]
-        parts = [p for p in parts if p]
-        return ", ".join(parts)
-    if isinstance(value, dict):
-        segments = []
-        for key, val in value.items():
-            summary = summarize_value_for_prompt(val)
-            if summary:
-                segments.append(f"{format_field_label(str(key))}: {summary}")
-        return "; ".join(segments)
+    if isinstance(value, (list, tuple, set, dict)):
+        return None
     return str(value)
+
+
+# Key of list items and of the top-level value; None is a valid dict key
+_NO_KEY = object()
+
+
+def _summary_frame(value: Any, label: Any) -> tuple:
+    # (children as (key or _NO_KEY, child) pairs, collected parts, separator,
+    # key this container is listed under in its parent)
+    if isinstance(value, dict):
+        return iter(value.items()), [], "; ", label
+    return zip(repeat(_NO_KEY), value), [], ", ", label
+
+
+def _add_summary(parts: list, key: Any, summary: str) -> None:
+    if summary:
+        parts.append(summary if key is _NO_KEY else f"{format_field_label(str(key))}: {summary}")
+
+
+def summarize_value_for_prompt(value: Any) -> str:
+    """Produce a readable summary for context shown to the language model."""
+
+    summary = _summarize_scalar(value)
+    if summary is not None:
+        return summary
+    # Post-order walk with an explicit stack instead of one call per node;
+    # each container joins its non-empty child summaries once it is done.
+    stack = [_summary_frame(value, _NO_KEY)]
+    while True:
+        children, parts, sep, label = stack[-1]
+        for key, child in children:
+            summary = _summarize_scalar(child)
+            if summary is None:
+                stack.append(_summary_frame(child, key))
+                break
+            _add_summary(parts, key, summary)
+        else:
+            stack.pop()
+            summary = sep.join(parts)
+            if not stack:
+                return summary
+            _add_summary(stack[-1][1], label, summary)
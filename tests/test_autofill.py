@@ -9,3 +9,146 @@ def test_autofill_stub_mode():
     out = service.generate("test prompt")
     assert isinstance(out, str)
     assert len(out) == 4  # stub returns 4 chars
+
+
+def test_autofill_batch_stub_mode():
+    service = AutofillService(stub_mode_var=DummyVar(True))
+    out = service.generate_batch(["a", "b", "c"])
+    assert len(out) == 3
+    assert all(isinstance(o, str) and len(o) == 4 for o in out)
+
+
+def test_autofill_batch_chunks_prompts(monkeypatch):
+    import types
+    import story_builder.autofill as autofill_module
+
+    batches = []
+
+    class FakeGenerator:
+        def __init__(self, **_kwargs): pass
+        def generate_batch(self, prompts):
+            batches.append(list(prompts))
+            return [f"{p}!" for p in prompts]
+
+    monkeypatch.setattr(autofill_module, "tg", types.SimpleNamespace(TextGenerator=FakeGenerator))
+    service = AutofillService(stub_mode_var=DummyVar(False), batch_size=2)
+
+    assert service.generate_batch(["a", "b", "c"]) == ["a!", "b!", "c!"]
+    assert batches == [["a", "b"], ["c"]]
+
+
+def test_autofill_caches_responses_on_disk(monkeypatch, tmp_path):
+    import types
+    import story_builder.autofill as autofill_module
+
+    prompts_seen = []
+
+    class FakeGenerator:
+        def __init__(self, **_kwargs): pass
+        def generate_text(self, prompt):
+            prompts_seen.append(prompt)
+            return f"reply {len(prompts_seen)}"
+
+    monkeypatch.setattr(autofill_module, "tg", types.SimpleNamespace(TextGenerator=FakeGenerator))
+
+    service = AutofillService(stub_mode_var=DummyVar(False), cache_dir=str(tmp_path))
+    assert service.generate("p") == "reply 1"
+    assert service.generate("p") == "reply 1"
+    assert service.generate("p", cache_bust=True) == "reply 2"
+    service.close()
+
+    # A fresh service (e.g. after restart) reads the response back from disk
+    reopened = AutofillService(stub_mode_var=DummyVar(False), cache_dir=str(tmp_path))
+    assert reopened.generate("p") == "reply 2"
+    reopened.close()
+    assert prompts_seen == ["p", "p"]
+
+
+def test_autofill_reuses_generator(monkeypatch):
+    import types
+    import story_builder.autofill as autofill_module
+
+    created = []
+
+    class FakeGenerator:
+        def __init__(self, **kwargs):
+            created.append(kwargs)
+        def generate_text(self, prompt):
+            return prompt.upper()
+
+    monkeypatch.setattr(autofill_module, "tg", types.SimpleNamespace(TextGenerator=FakeGenerator))
+    service = AutofillService(stub_mode_var=DummyVar(False))
+
+    assert service.generate("a") == "A"
+    assert service.generate("b") == "B"
+    assert len(created) == 1
+
+
+def test_autofill_preload_builds_the_generator_once(monkeypatch):
+    import types
+    import story_builder.autofill as autofill_module
+
+    created = []
+
+    class FakeGenerator:
+        def __init__(self, **kwargs):
+            created.append(kwargs)
+        def generate_text(self, prompt):
+            return prompt.upper()
+
+    monkeypatch.setattr(autofill_module, "tg", types.SimpleNamespace(TextGenerator=FakeGenerator))
+    service = AutofillService(stub_mode_var=DummyVar(False))
+
+    service.preload()
+    assert len(created) == 1
+    assert service.generate("a") == "A"
+    assert len(created) == 1 # the first click reuses the preloaded model
+
+
+def test_autofill_cache_key_covers_settings():
+    service = AutofillService(max_new_tokens=50)
+    other = AutofillService(max_new_tokens=150)
+    # Plain concatenation would make these two keys collide
+    assert service._cache_key("abc1") != other._cache_key("abc")
+
+    baseline = service._cache_key("p")
+    service.temperature = 0.2
+    assert service._cache_key("p") != baseline
+    service.temperature = 0.8
+    service.model_path = "other/model"
+    assert service._cache_key("p") != baseline
+
+
+def test_autofill_async_delivers_future_through_post():
+    import threading
+
+    posted = []
+    delivered = threading.Event()
+
+    def post(callback, *args):
+        posted.append((callback, args))
+        delivered.set()
+
+    service = AutofillService(stub_mode_var=DummyVar(True), post_to_ui=post)
+    results = []
+
+    service.generate_async("prompt", lambda f: results.append(f.result()))
+    assert delivered.wait(timeout=5)
+    callback, args = posted[0]
+    callback(*args)  # what the Tk thread would run
+
+    assert len(results) == 1 and len(results[0]) == 4
+
+
+def test_autofill_async_reads_stub_mode_on_the_calling_thread():
+    import threading
+
+    class ThreadCheckedVar(DummyVar):
+        def get(self):
+            assert threading.current_thread() is threading.main_thread(), "Tk var read off the UI thread"
+            return super().get()
+
+    service = AutofillService(stub_mode_var=ThreadCheckedVar(True))
+    future = service.generate_async("prompt", lambda f: None)
+
+    assert len(future.result(timeout=5)) == 4
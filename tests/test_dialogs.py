@@ -0,0 +1,184 @@
+import types
+from concurrent.futures import Future
+
+import story_builder.dialogs as dialogs_module
+from story_builder.dialogs import DialogRunner
+from story_builder.logger import Logger
+
+
+# ---- Minimal stand-ins for the tkinter widgets DialogRunner uses ----
+
+class FakeWidget:
+    def __init__(self, master=None, **kwargs):
+        self.master = master
+        self.options = dict(kwargs)
+        if "text" in kwargs and "command" in kwargs:
+            master.buttons[kwargs["text"]] = self
+
+    def pack(self, **_kwargs):
+        pass
+
+    def config(self, **kwargs):
+        self.options.update(kwargs)
+
+
+class FakeEntry(FakeWidget):
+    value = ""
+
+    def delete(self, _first, _last=None):
+        self.value = ""
+
+    def insert(self, _index, text):
+        self.value = text + self.value
+
+    def get(self):
+        return self.value
+
+
+class FakeToplevel:
+    def __init__(self, _root):
+        self.buttons = {}
+        self.bindings = {}
+        self.alive = True
+        # Callables run in turn while ask_field waits, standing in for clicks
+        self.script = []
+
+    def withdraw(self): pass
+    def transient(self, _master): pass
+    def title(self, _text): pass
+    def protocol(self, _name, _func): pass
+    def deiconify(self): pass
+    def wait_visibility(self): pass
+    def grab_set(self): pass
+    def grab_release(self): pass
+    def winfo_exists(self): return self.alive
+
+    def bind(self, sequence, func):
+        self.bindings[sequence] = func
+
+    def destroy(self):
+        self.alive = False
+        self.bindings["<Destroy>"](types.SimpleNamespace(widget=self))
+
+    def wait_variable(self, var):
+        before = var.get()
+        self.script.pop(0)()
+        assert var.get() != before, "tkwait variable would never return"
+
+
+class FakeIntVar:
+    def __init__(self, _master=None, value=0):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+class FakeAutofill:
+    def __init__(self):
+        self.callbacks = []
+        self.cache_busts = []
+
+    def generate_async(self, _prompt, callback, cache_bust=False):
+        self.callbacks.append(callback)
+        self.cache_busts.append(cache_bust)
+
+
+def _make_runner(monkeypatch):
+    fake_tk = types.SimpleNamespace(
+        Toplevel=FakeToplevel, Label=FakeWidget, Entry=FakeEntry, Button=FakeWidget, IntVar=FakeIntVar,
+        LEFT="left", RIGHT="right", END="end", NORMAL="normal", DISABLED="disabled", TclError=RuntimeError,
+    )
+    monkeypatch.setattr(dialogs_module, "tk", fake_tk)
+    autofill = FakeAutofill()
+    runner = DialogRunner(root=object(), autofill=autofill, logger=Logger())
+    runner._build_dialog()
+    return runner, autofill
+
+
+def _finished(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def test_autofill_result_fills_the_open_field(monkeypatch):
+    runner, autofill = _make_runner(monkeypatch)
+    dialog = runner._dialog
+
+    def click():
+        dialog.buttons["Autofill"].options["command"]()
+        assert dialog.buttons["Autofill"].options["state"] == "disabled"
+        autofill.callbacks[0](_finished("generated"))
+        dialog.buttons["OK"].options["command"]()
+
+    dialog.script.append(click)
+    assert runner.ask_field("Edit: tone", "tone", "old") == "generated"
+    assert dialog.buttons["Autofill"].options["state"] == "normal"
+
+
+def test_late_autofill_result_is_ignored(monkeypatch):
+    runner, autofill = _make_runner(monkeypatch)
+    dialog = runner._dialog
+
+    def autofill_then_ok():
+        dialog.buttons["Autofill"].options["command"]()
+        dialog.buttons["OK"].options["command"]()
+
+    dialog.script.append(autofill_then_ok)
+    assert runner.ask_field("Edit: tone", "tone", "old") == "old"
+
+    def deliver_stale_then_ok():
+        autofill.callbacks[0](_finished("stale"))
+        dialog.buttons["OK"].options["command"]()
+
+    dialog.script.append(deliver_stale_then_ok)
+    assert runner.ask_field("Edit: setting", "setting", "castle") == "castle"
+
+
+def test_nested_ask_field_is_refused(monkeypatch):
+    runner, _autofill = _make_runner(monkeypatch)
+    dialog = runner._dialog
+    inner = []
+
+    def reenter_then_ok():
+        inner.append(runner.ask_field("Edit: name", "name", "Bob"))
+        runner._entry.value = "grim"
+        dialog.buttons["OK"].options["command"]()
+
+    dialog.script.append(reenter_then_ok)
+    assert runner.ask_field("Edit: tone", "tone", "old") == "grim"
+    assert inner == ["Bob"]
+    assert runner._field["key"] == "tone"
+
+
+def test_repeated_autofill_bypasses_the_cache(monkeypatch):
+    runner, autofill = _make_runner(monkeypatch)
+    dialog = runner._dialog
+
+    def click_twice_then_ok():
+        for i in range(2):
+            dialog.buttons["Autofill"].options["command"]()
+            autofill.callbacks[i](_finished(f"try {i}"))
+        dialog.buttons["OK"].options["command"]()
+
+    dialog.script.append(click_twice_then_ok)
+    assert runner.ask_field("Edit: tone", "tone", "") == "try 1"
+    assert autofill.cache_busts == [False, True]
+
+
+def test_destroying_the_dialog_ends_the_open_field(monkeypatch):
+    runner, _autofill = _make_runner(monkeypatch)
+    dialog = runner._dialog
+
+    def type_then_destroy():
+        runner._entry.value = "unsaved"
+        dialog.destroy() # e.g. the main window closing with a field open
+
+    dialog.script.append(type_then_destroy)
+    assert runner.ask_field("Edit: tone", "tone", "old") == "old"
+    assert runner.exit_early
+    assert not runner._active
@@ -42,3 +42,51 @@ def test_fieldwalker_prompts_and_fills():
     scope_call = dialog.captured[1]
     assert scope_call["prompt_instruction"] == "scale"
     assert scope_call["context"] == {"setting": "sci-fi"}
+
+
+def test_fieldwalker_splits_list_input_on_commas_newlines_and_bullets():
+    dialog = DummyDialog(responses=["- dragons, elves\n* dwarves\r\n• orcs,,"])
+    walker = FieldWalker(dialog, full_edit_mode_var=DummyVar(False), logger=Logger())
+
+    filled = walker.walk({"races": []}, {})
+
+    assert filled["races"] == ["dragons", "elves", "dwarves", "orcs"]
+
+
+def test_fieldwalker_list_items_see_other_entries():
+    dialog = DummyDialog(responses=["Bob"])
+    walker = FieldWalker(dialog, full_edit_mode_var=DummyVar(False), logger=Logger())
+
+    data = {"title": "Saga", "names": ["Alice", "", "Carol"]}
+    filled = walker.walk(data, {})
+
+    assert filled["names"] == ["Alice", "Bob", "Carol"]
+    assert dialog.captured[0]["key"] == "names[1]"
+    assert dialog.captured[0]["context"] == {
+        "title": "Saga",
+        "Other Names entries": "Alice, Carol",
+    }
+
+
+def test_fieldwalker_handles_nesting_deeper_than_the_recursion_limit():
+    data = leaf = {}
+    for _ in range(2000):
+        leaf["inner"] = {}
+        leaf = leaf["inner"]
+    leaf["name"] = ""
+
+    dialog = DummyDialog(responses=["deep"])
+    walker = FieldWalker(dialog, full_edit_mode_var=DummyVar(False), logger=Logger())
+    walker.walk(data, {})
+
+    assert [call["key"] for call in dialog.captured] == ["name"]
+    assert leaf["name"] == "deep"
+
+
+def test_fieldwalker_keeps_leading_signs_that_are_not_bullets():
+    dialog = DummyDialog(responses=["-5 gold, *Nix\n- rope"])
+    walker = FieldWalker(dialog, full_edit_mode_var=DummyVar(False), logger=Logger())
+
+    filled = walker.walk({"items": []}, {})
+
+    assert filled["items"] == ["-5 gold", "*Nix", "rope"]
@@ -135,3 +135,70 @@ def test_edit_character_manual_and_autofill():
     assert data["name"] == "heroic" or data["role"] == "WXYZ"
 
     shutil.rmtree(tmpdir)
+
+
+class BridgeRoot:
+    """Stand-in Tk root recording after() calls and file handlers."""
+
+    def __init__(self, file_handlers=True):
+        self.scheduled = []
+        self.cancelled = []
+        self.handlers = {}
+        self.tk = self
+        self.file_handlers = file_handlers
+
+    def after(self, _ms, func):
+        self.scheduled.append(func)
+        return f"after#{len(self.scheduled)}"
+
+    def after_cancel(self, after_id):
+        self.cancelled.append(after_id)
+
+    def createfilehandler(self, fd, _mask, func):
+        if not self.file_handlers:
+            raise AttributeError("createfilehandler") # like Windows' tkapp
+        self.handlers[fd] = func
+
+    def deletefilehandler(self, fd):
+        del self.handlers[fd]
+
+
+def test_ui_bridge_polls_from_the_tk_thread_without_file_handlers():
+    import threading
+
+    app = StoryBuilderApp()
+    app.root = BridgeRoot(file_handlers=False)
+    app._install_ui_bridge()
+    assert len(app.root.scheduled) == 1 # the poll loop, started on the Tk thread
+
+    results = []
+    worker = threading.Thread(target=app._post_to_ui, args=(results.append, "done"))
+    worker.start()
+    worker.join()
+    assert len(app.root.scheduled) == 1 # posting never calls into Tk
+    assert results == []
+
+    app.root.scheduled[-1]() # next poll tick
+    assert results == ["done"]
+
+    app._close_ui_bridge()
+    assert app.root.cancelled == ["after#2"]
+
+
+def test_ui_bridge_releases_pipe_and_file_handler_on_close():
+    app = StoryBuilderApp()
+    app.root = BridgeRoot()
+    app._install_ui_bridge()
+    r, w = app._wake_r, app._wake_w
+
+    results = []
+    app._post_to_ui(results.append, "early") # e.g. _prewarm before mainloop
+    app.root.handlers[r]()
+    assert results == ["early"]
+
+    app._close_ui_bridge()
+    assert app.root.handlers == {}
+    for fd in (r, w):
+        with pytest.raises(OSError):
+            os.fstat(fd)
+    app._post_to_ui(results.append, "late") # only enqueued after close
@@ -0,0 +1,48 @@
+import os
+import tempfile
+
+from story_builder.logger import Logger
+
+
+class DummyVar:
+    def __init__(self, val): self._val = val
+    def get(self): return self._val
+
+
+def test_logger_writes_lines_in_background():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        log_file = os.path.join(tmpdir, "debug.log")
+        logger = Logger(DummyVar(True), log_file)
+        for i in range(3):
+            logger.log(f"line {i}")
+        logger.close()
+
+        with open(log_file, "r", encoding="utf-8") as f:
+            assert f.read() == "line 0\nline 1\nline 2\n"
+
+
+def test_disabled_logger_writes_nothing():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        log_file = os.path.join(tmpdir, "debug.log")
+        logger = Logger(DummyVar(False), log_file)
+        logger.log("hidden")
+        logger.close()
+
+        assert not os.path.exists(log_file)
+
+
+def test_logger_formats_args_lazily():
+    class Exploding:
+        def __repr__(self):
+            raise AssertionError("formatted while disabled")
+
+    Logger().log("value=%r", Exploding())  # disabled: never formatted
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        log_file = os.path.join(tmpdir, "debug.log")
+        logger = Logger(DummyVar(True), log_file)
+        logger.log("key=%r, type=%s", "tone", "str")
+        logger.close()
+
+        with open(log_file, "r", encoding="utf-8") as f:
+            assert f.read() == "key='tone', type=str\n"
@@ -1,9 +1,10 @@
 import json
-import tempfile
 import os
+
+import pytest
 from story_builder.project import ProjectPaths, Project
 
-def test_clear_template_and_save_load():
+def test_clear_template_and_save_load(tmp_path):
     paths = ProjectPaths()
     project = Project(paths)
 
@@ -16,8 +17,131 @@ def test_clear_template_and_save_load():
     assert cleared["story_preferences"]["themes"] == []
     assert cleared["world_details"]["magic_level"] == ""
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        json_path = os.path.join(tmpdir, "test.json")
-        project.save_json(cleared, json_path)
-        loaded = project.read_json(json_path)
-        assert loaded == cleared
+    json_path = str(tmp_path / "test.json")
+    project.save_json(cleared, json_path)
+    loaded = project.read_json(json_path)
+    assert loaded == cleared
+
+
+def test_save_load_without_orjson(monkeypatch, tmp_path):
+    import story_builder.project as project_module
+    monkeypatch.setattr(project_module, "orjson", None)
+    project = Project(ProjectPaths())
+
+    data = {"name": "Zoë", "traits": ["brave", ""], "notes": {"age": ""}}
+    json_path = str(tmp_path / "test.json")
+    project.save_json(data, json_path)
+    with open(json_path, "r", encoding="utf-8") as f:
+        assert f.read() == json.dumps(data, indent=2, ensure_ascii=False)
+    assert project.read_json(json_path) == data
+
+
+def test_list_characters_only_returns_json_files(tmp_path):
+    project = Project(ProjectPaths())
+    folder = str(tmp_path)
+    chars = project.characters_dir(folder)
+    project.save_json({}, os.path.join(chars, "Alice.json"))
+    open(os.path.join(chars, "notes.txt"), "w").close()
+    os.makedirs(os.path.join(chars, "old.json"))
+
+    assert project.list_characters(folder) == ["Alice"]
+
+
+def test_templates_are_parsed_once(monkeypatch):
+    import story_builder.project as project_module
+    project = Project(ProjectPaths())
+    project.invalidate_templates()
+
+    calls = []
+    original = project_module._read_json_file
+    monkeypatch.setattr(project_module, "_read_json_file", lambda path: calls.append(path) or original(path))
+
+    first = project.load_template("character_template.json")
+    second = Project(ProjectPaths()).load_template("character_template.json")
+    assert first is second
+    assert len(calls) == 1
+
+    project.invalidate_templates()
+    project.load_template("character_template.json")
+    assert len(calls) == 2
+
+
+def test_edited_template_is_reloaded(monkeypatch, tmp_path):
+    paths = ProjectPaths()
+    tmpdir = str(tmp_path)
+    monkeypatch.setattr(paths, "templates_dir", tmpdir)
+    project = Project(paths)
+    path = os.path.join(tmpdir, "prompts.json")
+
+    project.save_json({"tone": "old"}, path)
+    assert project.load_prompt_template("prompts.json") == {"tone": "old"}
+
+    project.save_json({"tone": "new"}, path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert project.load_prompt_template("prompts.json") == {"tone": "new"}
+
+
+def test_save_json_stringifies_non_string_keys(tmp_path):
+    project = Project(ProjectPaths())
+    json_path = str(tmp_path / "test.json")
+    project.save_json({1: "one", "two": {2: ""}}, json_path)
+    assert project.read_json(json_path) == {"1": "one", "two": {"2": ""}}
+
+
+def test_characters_dir_is_recreated_after_deletion(tmp_path):
+    import shutil
+    project = Project(ProjectPaths())
+    folder = str(tmp_path)
+
+    chars = project.characters_dir(folder)
+    shutil.rmtree(chars)
+
+    assert project.list_characters(folder) == []
+    assert os.path.isdir(chars)
+
+
+def test_read_json_large_file(monkeypatch, tmp_path):
+    import story_builder.project as project_module
+    monkeypatch.setattr(project_module, "_MMAP_THRESHOLD", 16)
+    project = Project(ProjectPaths())
+
+    data = {"entries": ["x" * 100 for _ in range(10)]}
+    json_path = str(tmp_path / "big.json")
+    project.save_json(data, json_path)
+    assert project.read_json(json_path) == data
+
+
+def test_clear_template_keeps_key_order_and_handles_deep_nesting():
+    project = Project(ProjectPaths())
+
+    cleared = project.clear_template({"b": {"y": 1, "x": None}, "a": ["z"]})
+    assert list(cleared) == ["b", "a"]
+    assert list(cleared["b"]) == ["y", "x"]
+    assert cleared == {"b": {"y": "", "x": ""}, "a": []}
+
+    deep = leaf = {}
+    for _ in range(5000):
+        leaf["next"] = {}
+        leaf = leaf["next"]
+    leaf["name"] = "x"
+    cleared = project.clear_template(deep)
+    for _ in range(5000):
+        cleared = cleared["next"]
+    assert cleared == {"name": ""}
+
+
+def test_preload_templates_skips_missing_without_ui(monkeypatch, tmp_path):
+    import story_builder.project as project_module
+    monkeypatch.setattr(project_module.messagebox, "showerror", lambda *a, **k: pytest.fail("UI call"))
+    paths = ProjectPaths()
+    monkeypatch.setattr(paths, "templates_dir", str(tmp_path))
+    project = Project(paths)
+    project.save_json({"name": ""}, str(tmp_path / "present.json"))
+
+    project.preload_templates("present.json", "missing.json")
+
+    calls = []
+    monkeypatch.setattr(project_module, "_read_json_file", lambda path: calls.append(path))
+    assert project.load_template("present.json") == {"name": ""}
+    assert calls == []
@@ -37,7 +37,7 @@ class CaptureDialog:
 
 
 def test_fieldwalker_includes_existing_context_for_autofill():
-    data = json.loads(Path("tests/sample_data/story_example.json").read_text())
+    data = json.loads(Path("tests/sample_data/story_example.json").read_bytes())
     prompts = {
         "story_preferences": {
             "tone": "Suggest a fitting tone (serious, lighthearted, grimdark, whimsical) for the story."
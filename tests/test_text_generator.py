@@ -1,3 +1,4 @@
+import os
 import types
 
 import pytest
@@ -20,6 +21,8 @@ class _FakeBatch(dict):
 class FakeTokenizer:
     """Fake tokenizer to avoid loading a real pretrained tokenizer."""
 
+    eos_token_id = 2
+
     @classmethod
     def from_pretrained(cls, *_args, **_kwargs):
         # Pretend we "loaded" a tokenizer from disk
@@ -32,6 +35,7 @@ class FakeTokenizer:
 
     def decode(self, ids, skip_special_tokens=True):
         # Simulates converting generated tokens back into text
+        self.last_decoded = ids
         return "hello world"
 
 
@@ -47,6 +51,9 @@ class FakeModel:
         # Pretend we "loaded" a model from disk
         return cls()
 
+    def eval(self):
+        return self
+
     def generate(self, **kwargs):
         # Save call arguments so tests can check them later
         self.last_generate_kwargs = kwargs
@@ -111,6 +118,8 @@ def test_generate_uses_sampling(monkeypatch):
 
     # The fake tokenizer always decodes to "hello world"
     assert text == "hello world"
+    # Only the 2 generated tokens are decoded, not the prompt
+    assert gen.tokenizer.last_decoded.tolist() == [4, 5]
 
     # Inspect arguments passed to FakeModel.generate()
     kwargs = gen.model.last_generate_kwargs
@@ -118,14 +127,21 @@ def test_generate_uses_sampling(monkeypatch):
     assert kwargs["do_sample"] is True       # ensures sampling mode is used
     assert kwargs["temperature"] == 0.7
     assert kwargs["top_p"] == 0.9
+    assert kwargs["top_k"] == 50
+    assert kwargs["cache_implementation"] == "static"  # KV cache reused across calls
 
+@pytest.mark.slow
+@pytest.mark.gpu
+@pytest.mark.skipif(not os.environ.get("RUN_HEAVY_MODEL_TESTS"), reason="heavy model test; set RUN_HEAVY_MODEL_TESTS=1")
 def test_real_model_generation():
     """Integration test:
     Load the real model and check that generated text is valid.
     """
 
     # ⚠️ This will be slow and require a lot of RAM/VRAM
-    model_path = r"C:\Users\nicol\Documents\01_Code\models\dolphin-2.6-mistral-7b"
+    model_path = os.environ.get(
+        "HEAVY_MODEL_PATH", r"C:\Users\nicol\Documents\01_Code\models\dolphin-2.6-mistral-7b"
+    )
 
     # Create generator with a small token limit so the test is fast
     gen = tg.TextGenerator(model_path, max_new_tokens=20)
@@ -137,4 +153,384 @@ def test_real_model_generation():
     # Basic sanity checks
     assert isinstance(output, str)            # must be a string
     assert len(output.strip()) > 0            # must not be empty
-    assert len(output.split()) <= 25          # crude check: <= max tokens + prompt length
\ No newline at end of file
+    assert len(output.split()) <= 25          # crude check: <= max tokens + prompt length
+
+def test_attention_falls_back_to_sdpa(monkeypatch):
+    """Test that a missing flash-attn install falls back to the SDPA kernel."""
+
+    requested = []
+
+    def fake_from_pretrained(*_args, **kwargs):
+        requested.append(kwargs["attn_implementation"])
+        if kwargs["attn_implementation"] == "flash_attention_2":
+            raise ImportError("flash_attn is not installed")
+        return FakeModel()
+
+    monkeypatch.setattr(tg, "AutoModelForCausalLM",
+                        types.SimpleNamespace(from_pretrained=fake_from_pretrained))
+    monkeypatch.setattr(tg, "AutoTokenizer",
+                        types.SimpleNamespace(from_pretrained=FakeTokenizer.from_pretrained))
+    monkeypatch.setattr(torch.cuda, "is_available", lambda: False)
+
+    gen = tg.TextGenerator("dummy/path")
+
+    assert requested == ["flash_attention_2", "sdpa"]
+    assert isinstance(gen.model, FakeModel)
+
+
+def test_draft_model_enables_assisted_generation(monkeypatch):
+    """Test that a draft model is forwarded to generate() as assistant_model."""
+
+    monkeypatch.setattr(tg, "AutoModelForCausalLM",
+                        types.SimpleNamespace(from_pretrained=FakeModel.from_pretrained))
+    monkeypatch.setattr(tg, "AutoTokenizer",
+                        types.SimpleNamespace(from_pretrained=FakeTokenizer.from_pretrained))
+    monkeypatch.setattr(torch.cuda, "is_available", lambda: False)
+    monkeypatch.setattr(FakeModel, "config", types.SimpleNamespace(vocab_size=32000), raising=False)
+
+    gen = tg.TextGenerator("dummy/path", draft_model_path="dummy/draft")
+    gen.generate_text("hi")
+
+    kwargs = gen.model.last_generate_kwargs
+    assert kwargs["assistant_model"] is gen.assistant_model
+    assert kwargs["num_assistant_tokens"] == 5
+    assert "cache_implementation" not in kwargs
+
+
+def test_batch_with_draft_model_skips_assisted_generation(monkeypatch):
+    """Test that a multi-prompt batch is not sent through assisted generation."""
+
+    class BatchTokenizer(FakeTokenizer):
+        def __call__(self, prompts, return_tensors="pt", padding=False, **_kwargs):
+            ids = torch.tensor([[1, 2, 3]] * len(prompts))
+            return _FakeBatch({"input_ids": ids, "attention_mask": torch.ones_like(ids)})
+
+        def batch_decode(self, ids, skip_special_tokens=True):
+            return ["hello world"] * len(ids)
+
+    class BatchModel(FakeModel):
+        def generate(self, **kwargs):
+            if "assistant_model" in kwargs and kwargs["input_ids"].shape[0] > 1:
+                raise ValueError("assisted generate is only supported for batch_size = 1")
+            self.last_generate_kwargs = kwargs
+            rows = kwargs["input_ids"].shape[0]
+            return torch.cat([kwargs["input_ids"], torch.tensor([[4, 5]] * rows)], dim=-1)
+
+    monkeypatch.setattr(tg, "AutoModelForCausalLM",
+                        types.SimpleNamespace(from_pretrained=BatchModel.from_pretrained))
+    monkeypatch.setattr(tg, "AutoTokenizer",
+                        types.SimpleNamespace(from_pretrained=BatchTokenizer.from_pretrained))
+    monkeypatch.setattr(torch.cuda, "is_available", lambda: False)
+    monkeypatch.setattr(BatchModel, "config", types.SimpleNamespace(vocab_size=32000), raising=False)
+    monkeypatch.setattr(BatchTokenizer, "pad_token", "</s>", raising=False)
+    monkeypatch.setattr(BatchTokenizer, "eos_token", "</s>", raising=False)
+
+    gen = tg.TextGenerator("dummy/path", draft_model_path="dummy/draft")
+    assert gen.generate_batch(["a", "b"]) == ["hello world", "hello world"]
+    assert "assistant_model" not in gen.model.last_generate_kwargs
+
+    # A single prompt still uses the draft model
+    gen.generate_batch(["a"])
+    assert gen.model.last_generate_kwargs["assistant_model"] is gen.assistant_model
+
+
+def test_draft_model_with_other_vocabulary_is_rejected(monkeypatch):
+    """Test that a draft model with a different vocabulary raises ValueError."""
+
+    loaded = []
+
+    def fake_from_pretrained(path, **kwargs):
+        loaded.append(kwargs)
+        model = FakeModel()
+        model.config = types.SimpleNamespace(vocab_size=32000 if path == "dummy/path" else 32002)
+        return model
+
+    monkeypatch.setattr(tg, "AutoModelForCausalLM",
+                        types.SimpleNamespace(from_pretrained=fake_from_pretrained))
+    monkeypatch.setattr(tg, "AutoTokenizer",
+                        types.SimpleNamespace(from_pretrained=FakeTokenizer.from_pretrained))
+    monkeypatch.setattr(torch.cuda, "is_available", lambda: False)
+
+    with pytest.raises(ValueError):
+        tg.TextGenerator("dummy/path", draft_model_path="dummy/draft", quantization="fp16")
+    # The draft model is loaded in the same dtype as the main model
+    assert loaded[-1]["torch_dtype"] is loaded[0]["torch_dtype"]
+
+
+def test_repeated_prompt_is_tokenized_once(monkeypatch):
+    """Test that identical prompts reuse the cached input_ids."""
+
+    calls = []
+
+    class CountingTokenizer(FakeTokenizer):
+        def __call__(self, prompt, return_tensors="pt"):
+            calls.append(prompt)
+            return super().__call__(prompt, return_tensors=return_tensors)
+
+    monkeypatch.setattr(tg, "AutoModelForCausalLM",
+                        types.SimpleNamespace(from_pretrained=FakeModel.from_pretrained))
+    monkeypatch.setattr(tg, "AutoTokenizer",
+                        types.SimpleNamespace(from_pretrained=CountingTokenizer.from_pretrained))
+    monkeypatch.setattr(torch.cuda, "is_available", lambda: False)
+
+    gen = tg.TextGenerator("dummy/path")
+    gen.generate_text("hi")
+    gen.generate_text("hi")
+
+    assert calls == ["hi"]
+    assert torch.equal(gen.model.last_generate_kwargs["attention_mask"], torch.ones(1, 3, dtype=torch.long))
+
+
+def test_generate_batch_pads_left_and_decodes_completions(monkeypatch):
+    """Test that generate_batch issues one generate() call for all prompts."""
+
+    class BatchTokenizer(FakeTokenizer):
+        pad_token = None
+        eos_token = "</s>"
+
+        def __call__(self, prompts, return_tensors="pt", padding=False):
+            assert padding is True
+            self.padding_side_seen = self.padding_side
+            return _FakeBatch({
+                "input_ids": torch.tensor([[1, 2, 3]] * len(prompts)),
+                "attention_mask": torch.ones(len(prompts), 3, dtype=torch.long),
+            })
+
+        def batch_decode(self, ids, skip_special_tokens=True):
+            return [f" row{len(row)} " for row in ids]
+
+    class BatchModel(FakeModel):
+        def generate(self, **kwargs):
+            self.last_generate_kwargs = kwargs
+            n = kwargs["input_ids"].shape[0]
+            return torch.tensor([[1, 2, 3, 4, 5]] * n)
+
+    monkeypatch.setattr(tg, "AutoModelForCausalLM",
+                        types.SimpleNamespace(from_pretrained=BatchModel.from_pretrained))
+    monkeypatch.setattr(tg, "AutoTokenizer",
+                        types.SimpleNamespace(from_pretrained=BatchTokenizer.from_pretrained))
+    monkeypatch.setattr(torch.cuda, "is_available", lambda: False)
+
+    gen = tg.TextGenerator("dummy/path")
+    texts = gen.generate_batch(["a", "b"])
+
+    assert texts == ["row2", "row2"]  # only the 2 generated tokens per row
+    assert gen.tokenizer.padding_side_seen == "left"
+    assert gen.tokenizer.pad_token == "</s>"
+    assert "attention_mask" in gen.model.last_generate_kwargs
+
+
+def test_generate_batch_applies_system_prompt(monkeypatch):
+    """Test that batched prompts get the same system prefix as generate_text."""
+
+    class PromptTokenizer(FakeTokenizer):
+        pad_token = "</s>"
+        pad_token_id = 0
+
+        def __call__(self, prompt, return_tensors="pt", add_special_tokens=True):
+            if prompt == "be terse":
+                return _FakeBatch({"input_ids": torch.tensor([[7, 7]])})
+            return _FakeBatch({"input_ids": torch.tensor([[10 + i for i in range(len(prompt))]])})
+
+        def batch_decode(self, ids, skip_special_tokens=True):
+            return ["ok" for _ in ids]
+
+    class BatchModel(FakeModel):
+        def generate(self, **kwargs):
+            self.last_generate_kwargs = kwargs
+            return kwargs["input_ids"]
+
+    monkeypatch.setattr(tg, "AutoModelForCausalLM",
+                        types.SimpleNamespace(from_pretrained=BatchModel.from_pretrained))
+    monkeypatch.setattr(tg, "AutoTokenizer",
+                        types.SimpleNamespace(from_pretrained=PromptTokenizer.from_pretrained))
+    monkeypatch.setattr(torch.cuda, "is_available", lambda: False)
+
+    gen = tg.TextGenerator("dummy/path", system_prompt="be terse")
+    gen.generate_batch(["a", "abc"])
+
+    kwargs = gen.model.last_generate_kwargs
+    # Each user prompt follows the system prompt on a new line ("\n" -> 10)
+    assert kwargs["input_ids"].tolist() == [[0, 0, 7, 7, 10, 11], [7, 7, 10, 11, 12, 13]]
+    assert kwargs["attention_mask"].tolist() == [[0, 0, 1, 1, 1, 1], [1, 1, 1, 1, 1, 1]]
+
+
+def test_system_prompt_uses_chat_template_for_the_user_turn(monkeypatch):
+    """Test that the user prompt is rendered as a templated user turn after
+    the cached system turn, not appended as raw text."""
+
+    class ChatTokenizer(FakeTokenizer):
+        chat_template = "fake"
+
+        def apply_chat_template(self, messages, tokenize=False, add_generation_prompt=False):
+            text = "".join(f"<{m['role']}>{m['content']}</{m['role']}>" for m in messages)
+            return text + ("<assistant>" if add_generation_prompt else "")
+
+        def __call__(self, text, return_tensors="pt", add_special_tokens=True):
+            self.seen = getattr(self, "seen", []) + [text]
+            return _FakeBatch({"input_ids": torch.tensor([[ord(c) for c in text]])})
+
+    monkeypatch.setattr(tg, "AutoModelForCausalLM",
+                        types.SimpleNamespace(from_pretrained=FakeModel.from_pretrained))
+    monkeypatch.setattr(tg, "AutoTokenizer",
+                        types.SimpleNamespace(from_pretrained=ChatTokenizer.from_pretrained))
+    monkeypatch.setattr(torch.cuda, "is_available", lambda: False)
+
+    gen = tg.TextGenerator("dummy/path", system_prompt="S")
+    ids = gen._encode("P")[0].tolist()
+
+    assert "".join(map(chr, ids)) == "<system>S</system><user>P</user><assistant>"
+    # Only the part after the cached system turn is tokenized per prompt
+    assert gen.tokenizer.seen == ["<system>S</system>", "<user>P</user><assistant>"]
+
+
+def test_auto_quantization_skips_nf4_when_fp16_fits(monkeypatch):
+    """Test that small models that fit in free VRAM are loaded unquantized."""
+
+    loaded = {}
+
+    def fake_from_pretrained(*_args, **kwargs):
+        loaded.update(kwargs)
+        return FakeModel()
+
+    monkeypatch.setattr(tg, "AutoModelForCausalLM",
+                        types.SimpleNamespace(from_pretrained=fake_from_pretrained))
+    monkeypatch.setattr(tg, "AutoTokenizer",
+                        types.SimpleNamespace(from_pretrained=FakeTokenizer.from_pretrained))
+    monkeypatch.setattr(tg, "AutoConfig", types.SimpleNamespace(
+        from_pretrained=lambda *_a, **_k: types.SimpleNamespace(
+            num_hidden_layers=2, hidden_size=64, vocab_size=1000, intermediate_size=256)))
+    monkeypatch.setattr(torch.cuda, "is_available", lambda: True)
+    monkeypatch.setattr(torch.cuda, "mem_get_info", lambda: (8 * 1024**3, 8 * 1024**3))
+
+    assert tg.TextGenerator._pick_quantization("dummy/path") == "fp16"
+
+    monkeypatch.setattr(torch.cuda, "is_available", lambda: False)
+    gen = tg.TextGenerator("dummy/path", quantization="fp16")
+    assert gen.quantization == "fp16"
+    assert loaded["quantization_config"] is None
+
+
+def test_auto_quantization_counts_embeddings_mlp_and_kv_cache(monkeypatch):
+    """Test that a Mistral-7B-shaped model stays NF4 on a 16 GB card, which a
+    layers * hidden**2 estimate alone would have let through as fp16."""
+
+    mistral = types.SimpleNamespace(
+        num_hidden_layers=32, hidden_size=4096, num_attention_heads=32, num_key_value_heads=8,
+        intermediate_size=14336, vocab_size=32000, max_position_embeddings=32768,
+    )
+    monkeypatch.setattr(tg, "AutoConfig", types.SimpleNamespace(from_pretrained=lambda *_a, **_k: mistral))
+    monkeypatch.setattr(torch.cuda, "is_available", lambda: True)
+    monkeypatch.setattr(torch.cuda, "mem_get_info", lambda: (16 * 1024**3, 16 * 1024**3))
+
+    assert tg.TextGenerator._pick_quantization("dummy/path") == "nf4"
+
+    monkeypatch.setattr(torch.cuda, "mem_get_info", lambda: (24 * 1024**3, 24 * 1024**3))
+    assert tg.TextGenerator._pick_quantization("dummy/path") == "fp16"
+
+
+def test_auto_quantization_falls_back_to_nf4_when_config_is_unreadable(monkeypatch):
+    """Test that a config that cannot be loaded keeps the NF4 default."""
+
+    def missing(*_a, **_k):
+        raise OSError("no config.json")
+
+    monkeypatch.setattr(tg, "AutoConfig", types.SimpleNamespace(from_pretrained=missing))
+    monkeypatch.setattr(torch.cuda, "is_available", lambda: True)
+
+    assert tg.TextGenerator._pick_quantization("dummy/path") == "nf4"
+
+
+def test_zero_temperature_uses_greedy_decoding(monkeypatch):
+    """Test that temperature <= 0 switches generate() to greedy decoding."""
+
+    monkeypatch.setattr(tg, "AutoModelForCausalLM",
+                        types.SimpleNamespace(from_pretrained=FakeModel.from_pretrained))
+    monkeypatch.setattr(tg, "AutoTokenizer",
+                        types.SimpleNamespace(from_pretrained=FakeTokenizer.from_pretrained))
+    monkeypatch.setattr(torch.cuda, "is_available", lambda: False)
+
+    gen = tg.TextGenerator("dummy/path", temperature=0)
+    gen.generate_text("hi")
+
+    kwargs = gen.model.last_generate_kwargs
+    assert kwargs["do_sample"] is False
+    assert kwargs["num_beams"] == 1
+    assert "temperature" not in kwargs
+
+
+def test_generate_stream_yields_completion(monkeypatch):
+    """Test that generate_stream() yields text pushed to the streamer."""
+
+    class StreamModel(FakeModel):
+        def generate(self, **kwargs):
+            self.last_generate_kwargs = kwargs
+            streamer = kwargs["streamer"]
+            streamer.put(kwargs["input_ids"])  # prompt, skipped by the streamer
+            streamer.put(torch.tensor([4, 5]))
+            streamer.end()
+            return torch.tensor([[1, 2, 3, 4, 5]])
+
+    monkeypatch.setattr(tg, "AutoModelForCausalLM",
+                        types.SimpleNamespace(from_pretrained=StreamModel.from_pretrained))
+    monkeypatch.setattr(tg, "AutoTokenizer",
+                        types.SimpleNamespace(from_pretrained=FakeTokenizer.from_pretrained))
+    monkeypatch.setattr(torch.cuda, "is_available", lambda: False)
+
+    gen = tg.TextGenerator("dummy/path")
+    first = "".join(gen.generate_stream("hi"))
+    executor = gen._stream_executor
+    second = "".join(gen.generate_stream("hi"))
+
+    assert first == second == "hello world"
+    assert gen._stream_executor is executor  # worker reused across calls
+
+
+def test_generate_stream_stops_when_consumer_breaks_early(monkeypatch):
+    """Test that abandoning a stream ends its generation and frees the worker."""
+
+    class EndlessStreamModel(FakeModel):
+        steps = 0
+
+        def generate(self, **kwargs):
+            streamer = kwargs["streamer"]
+            stopping = kwargs["stopping_criteria"]
+            ids = torch.tensor([[1, 2, 3]])
+            streamer.put(ids)  # prompt, skipped by the streamer
+            while not stopping(ids, None).all():
+                EndlessStreamModel.steps += 1
+                assert EndlessStreamModel.steps < 10_000, "generation was never stopped"
+                ids = torch.cat([ids, torch.tensor([[4]])], dim=-1)
+                streamer.put(torch.tensor([4]))
+            streamer.end()
+            return ids
+
+    monkeypatch.setattr(tg, "AutoModelForCausalLM",
+                        types.SimpleNamespace(from_pretrained=EndlessStreamModel.from_pretrained))
+    monkeypatch.setattr(tg, "AutoTokenizer",
+                        types.SimpleNamespace(from_pretrained=FakeTokenizer.from_pretrained))
+    monkeypatch.setattr(torch.cuda, "is_available", lambda: False)
+
+    gen = tg.TextGenerator("dummy/path")
+    for _ in range(2):
+        stream = gen.generate_stream("hi")
+        assert next(stream) == "hello "
+        stream.close()  # returns only once the run has ended
+        EndlessStreamModel.steps = 0
+
+
+def test_outputs_are_stripped(monkeypatch):
+    """Test the contract callers rely on: returned text is already stripped."""
+
+    class PaddedTokenizer(FakeTokenizer):
+        def decode(self, ids, skip_special_tokens=True):
+            return "  hello world \n"
+
+    monkeypatch.setattr(tg, "AutoModelForCausalLM",
+                        types.SimpleNamespace(from_pretrained=FakeModel.from_pretrained))
+    monkeypatch.setattr(tg, "AutoTokenizer",
+                        types.SimpleNamespace(from_pretrained=PaddedTokenizer.from_pretrained))
+    monkeypatch.setattr(torch.cuda, "is_available", lambda: False)
+
+    gen = tg.TextGenerator("dummy/path")
+    assert gen.generate_text("hi") == "hello world"
@@ -1,7 +1,37 @@
 import pytest
-from story_builder.utils import sanitize_project_name
+from story_builder.utils import sanitize_project_name, summarize_value_for_prompt
 
 def test_sanitize_project_name():
     assert sanitize_project_name("My Project!") == "My_Project_"
     assert sanitize_project_name("safe-name_123") == "safe-name_123"
     assert sanitize_project_name("a/b\\c") == "a_b_c"
+
+
+def test_sanitize_project_name_replaces_non_ascii():
+    assert sanitize_project_name("Zoë's 🐉 saga") == "Zo__s___saga"
+
+
+def test_summarize_value_for_prompt_nested():
+    value = {
+        "home_town": " Rivermoor ",
+        "traits": ["brave", "", None, ["quick", "loyal"]],
+        "stats": {"age": 31, "notes": ""},
+        "empty": {},
+    }
+    assert summarize_value_for_prompt(value) == (
+        "Home town: Rivermoor; Traits: brave, quick, loyal; Stats: Age: 31"
+    )
+
+
+def test_summarize_value_for_prompt_deep_nesting():
+    value = leaf = []
+    for _ in range(5000):
+        leaf.append([])
+        leaf = leaf[0]
+    leaf.append("bottom")
+    assert summarize_value_for_prompt(value) == "bottom"
+
+
+def test_summarize_value_for_prompt_keeps_none_keys():
+    assert summarize_value_for_prompt({None: True}) == "None: True"
+    assert summarize_value_for_prompt({"a": {None: [1, {None: "x"}]}}) == "A: None: 1, None: x"